@@ -0,0 +1,272 @@
+"""
+Bulk ingestion of a directory or glob of documents.
+
+Runs ingestion as a pipeline: PDF page extraction in a process pool streamed
+into LLM extraction with bounded async concurrency, and batched embedding + upserts.
+Progress is checkpointed so an interrupted run resumes where it stopped.
+
+    python -m backend.bulk_ingest data/mock_data
+    python -m backend.bulk_ingest "archive/**/*.pdf" --workers 8 --llm-concurrency 16
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from backend.config import settings
+from backend.catalog import catalog
+from backend.documents import PROCESS_CONTEXT, file_hash
+from backend.ingestion import extract_decisions_from_file, index_decisions, indexed_version_count
+from backend.qdrant_client_wrapper import db_client
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+
+
+def discover_files(target: str) -> List[str]:
+    """
+    Expands a directory (recursively) or a glob pattern into file paths.
+    """
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "**", "*"), recursive=True)
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(
+        os.path.abspath(p) for p in paths
+        if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of finished files. A file is skipped on resume
+    if its size and mtime are unchanged since it was recorded.
+    With path None, progress is only tracked in memory.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: Dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from an interrupted run
+                        continue
+                    self.done[entry["path"]] = entry
+
+    def is_done(self, path: str) -> bool:
+        entry = self.done.get(path)
+        if entry is None:
+            return False
+        stat = os.stat(path)
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def record(self, path: str, content_hash: str, status: str, decisions: int):
+        stat = os.stat(path)
+        entry = {
+            "path": path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": content_hash,
+            "status": status,
+            "decisions": decisions,
+        }
+        self.done[path] = entry
+        if not self.path:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+class BulkIngestor:
+    def __init__(self, checkpoint: Checkpoint, workers: int, llm_concurrency: int, batch_size: int):
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.llm_concurrency = llm_concurrency
+        self.batch_size = batch_size
+        # Busy seconds per stage, summed over all documents
+        self.stage_timings = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.failures: List[tuple] = []
+
+    async def _timed(self, stage: str, awaitable):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.stage_timings[stage] += time.perf_counter() - start
+
+    async def run(self, paths: List[str]):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size)
+        llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        # Caps documents held in memory between extraction and indexing
+        in_flight = asyncio.Semaphore(max(self.workers, self.llm_concurrency) * 2)
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=PROCESS_CONTEXT) as pool:
+            async def process(path: str):
+                filename = os.path.basename(path)
+                async with in_flight:
+                    try:
+                        content_hash = await self._timed("hash", asyncio.to_thread(file_hash, path))
+
+                        existing = await asyncio.to_thread(indexed_version_count, filename, content_hash)
+                        if existing is not None:
+                            self.counts["unchanged"] += 1
+                            self.checkpoint.record(path, content_hash, "unchanged", existing)
+                            catalog.record(filename, content_hash=content_hash, size=os.path.getsize(path),
+                                           status="done", decision_count=existing, error=None)
+                            return
+
+                        timings = {}
+                        async with llm_slots:
+                            decisions = await asyncio.to_thread(
+                                extract_decisions_from_file, path, filename, pool, timings)
+                        for stage, seconds in timings.items():
+                            self.stage_timings[stage] += seconds
+                        await queue.put((path, filename, content_hash, decisions, timings))
+                    except Exception as e:
+                        logger.error(f"Failed to ingest {path}: {e}")
+                        self.failures.append((path, str(e)))
+                        catalog.record(filename, status="failed", error=str(e))
+
+            consumer = asyncio.create_task(self._consume(queue))
+            await asyncio.gather(*(process(path) for path in paths))
+            await queue.put(None)
+            await consumer
+
+    async def _consume(self, queue: asyncio.Queue):
+        """
+        Collects extracted documents and indexes them once batch_size
+        decisions are pending, so embedding and upserts run in large batches.
+        """
+        batch = []
+        pending = 0
+        while True:
+            item = await queue.get()
+            if item is not None:
+                batch.append(item)
+                pending += len(item[3])
+            if batch and (item is None or pending >= self.batch_size):
+                await self._flush(batch)
+                batch, pending = [], 0
+            if item is None:
+                return
+
+    async def _flush(self, batch: list):
+        decisions = [d for _, _, _, file_decisions, _ in batch for d in file_decisions]
+        source_hashes = {filename: content_hash for _, filename, content_hash, _, _ in batch}
+        timings = {}
+        try:
+            await asyncio.to_thread(index_decisions, decisions, source_hashes, timings)
+        except Exception as e:
+            logger.error(f"Failed to index batch of {len(batch)} documents: {e}")
+            self.failures.extend((path, str(e)) for path, _, _, _, _ in batch)
+            for _, filename, _, _, _ in batch:
+                catalog.record(filename, status="failed", error=str(e))
+            return
+        for stage, seconds in timings.items():
+            self.stage_timings[stage] += seconds
+
+        # Embedding and upsert run per batch, so only the extraction stages are per document
+        for path, filename, content_hash, file_decisions, file_timings in batch:
+            self.checkpoint.record(path, content_hash, "done", len(file_decisions))
+            catalog.record(filename, content_hash=content_hash, size=os.path.getsize(path), status="done",
+                           decision_count=len(file_decisions), stage_timings=file_timings, error=None)
+            self.counts["ingested"] += 1
+            self.counts["decisions"] += len(file_decisions)
+        logger.info(f"Indexed {len(decisions)} decisions from {len(batch)} documents "
+                    f"({self.counts['ingested']} documents so far)")
+
+
+def ingest_paths(paths: List[str], checkpoint_path: Optional[str] = None, workers: int = None,
+                 llm_concurrency: int = None, batch_size: int = None, resume: bool = True) -> dict:
+    """
+    Runs the bulk pipeline over paths and returns a summary dict.
+    Without checkpoint_path, progress is not persisted.
+    """
+    if checkpoint_path and not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+
+    todo = [p for p in paths if not checkpoint.is_done(p)]
+    ingestor = BulkIngestor(
+        checkpoint,
+        workers=workers or settings.BULK_WORKERS,
+        llm_concurrency=llm_concurrency or settings.BULK_LLM_CONCURRENCY,
+        batch_size=batch_size or settings.BULK_BATCH_SIZE
+    )
+
+    db_client.ensure_collection_exists()
+    start = time.perf_counter()
+    asyncio.run(ingestor.run(todo))
+    elapsed = time.perf_counter() - start
+
+    processed = ingestor.counts["ingested"] + ingestor.counts["unchanged"]
+    return {
+        "documents_found": len(paths),
+        "skipped_from_checkpoint": len(paths) - len(todo),
+        "ingested": ingestor.counts["ingested"],
+        "unchanged": ingestor.counts["unchanged"],
+        "failed": len(ingestor.failures),
+        "decisions": ingestor.counts["decisions"],
+        "elapsed_seconds": round(elapsed, 2),
+        "docs_per_second": round(processed / elapsed, 2) if elapsed else 0.0,
+        "stage_seconds": {stage: round(seconds, 2) for stage, seconds in ingestor.stage_timings.items()},
+        "failures": ingestor.failures,
+    }
+
+
+def print_summary(summary: dict):
+    print("\n--- Bulk Ingestion Summary ---")
+    for key in ("documents_found", "skipped_from_checkpoint", "ingested", "unchanged",
+                "failed", "decisions", "elapsed_seconds", "docs_per_second"):
+        print(f"{key}: {summary[key]}")
+    print("stage time (busy seconds, summed across workers):")
+    for stage, seconds in summary["stage_seconds"].items():
+        print(f"  {stage}: {seconds}")
+    for path, error in summary["failures"]:
+        print(f"FAILED {path}: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", help="Directory (searched recursively) or glob pattern")
+    parser.add_argument("--checkpoint", default=settings.BULK_CHECKPOINT_PATH)
+    parser.add_argument("--workers", type=int, default=settings.BULK_WORKERS,
+                        help="Processes for PDF page extraction")
+    parser.add_argument("--llm-concurrency", type=int, default=settings.BULK_LLM_CONCURRENCY,
+                        help="Documents in LLM extraction at once")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_BATCH_SIZE,
+                        help="Decisions per embedding/upsert batch")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and reset the checkpoint file")
+    args = parser.parse_args()
+
+    paths = discover_files(args.target)
+    print(f"Found {len(paths)} documents in {args.target}")
+    summary = ingest_paths(
+        paths,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        batch_size=args.batch_size,
+        resume=not args.no_resume
+    )
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
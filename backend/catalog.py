@@ -0,0 +1,232 @@
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from backend.config import settings
+
+# Columns GET /uploads/ can sort on, each backed by an index
+SORT_COLUMNS = ("uploaded_at", "filename", "size", "decision_count")
+
+# Indexed sort key of each column. Missing sizes and counts sort as -1, so
+# (key, filename) is never NULL and pages can continue after the last row
+_SORT_KEYS = {
+    "uploaded_at": "uploaded_at",
+    "filename": "filename",
+    "size": "COALESCE(size, -1)",
+    "decision_count": "COALESCE(decision_count, -1)",
+}
+
+_COLUMNS = ("content_hash", "size", "uploaded_at", "status", "decision_count", "stage_timings", "error",
+            "indexed_hash", "updated_at")
+
+
+class DocumentCatalog:
+    """
+    SQLite table of ingested documents (hash, size, upload time, ingestion
+    status, decision count and stage timings), written during ingestion so
+    listing uploads never has to scan the documents directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " filename TEXT PRIMARY KEY,"
+                " content_hash TEXT,"
+                " size INTEGER,"
+                " uploaded_at REAL NOT NULL,"
+                " status TEXT,"
+                " decision_count INTEGER,"
+                " stage_timings TEXT,"
+                " error TEXT,"
+                " indexed_hash TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            # Ties are broken by filename, so the indexes cover the whole ORDER BY
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_uploaded_at ON documents(uploaded_at, filename)")
+            for column in ("size", "decision_count"):
+                # On the sort key, which never is NULL
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_documents_{column}"
+                             f" ON documents({_SORT_KEYS[column]}, filename)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, filename: str, **fields):
+        """
+        Creates or updates a document's row. Only the given columns are
+        changed; new rows get uploaded_at = now unless it is given.
+        """
+        unknown = set(fields) - set(_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown catalog columns: {', '.join(sorted(unknown))}")
+        if "stage_timings" in fields and fields["stage_timings"] is not None:
+            fields["stage_timings"] = json.dumps(fields["stage_timings"])
+        now = time.time()
+        fields["updated_at"] = now
+        inserted = {"uploaded_at": now, **fields}
+
+        columns = ["filename"] + list(inserted)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                f"INSERT INTO documents ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+                f" ON CONFLICT(filename) DO UPDATE SET {updates}",
+                [filename] + list(inserted.values())
+            )
+            conn.commit()
+
+    def list_documents(self, limit: int = 100, after: Optional[tuple] = None, sort: str = "uploaded_at",
+                       descending: bool = True) -> Tuple[List[dict], Optional[tuple]]:
+        """
+        One page of documents, starting after the (sort key, filename) pair
+        of the previous page's last row. Pages are read by seeking in the
+        index, so deep pages cost as much as the first one and documents
+        added meanwhile never shift rows between pages. Returns the page and
+        the pair to continue after.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}, expected one of {', '.join(SORT_COLUMNS)}")
+        key = _SORT_KEYS[sort]
+        direction = "DESC" if descending else "ASC"
+        where, params = "", []
+        if after is not None:
+            comparison = "<" if descending else ">"
+            if sort == "filename":
+                where, params = f"WHERE filename {comparison} ?", [after[1]]
+            else:
+                # Spelled out rather than as a row value, so SQLite seeks the expression indexes too
+                where = f"WHERE {key} {comparison}= ? AND ({key} {comparison} ? OR filename {comparison} ?)"
+                params = [after[0], after[0], after[1]]
+        order = f"filename {direction}" if sort == "filename" else f"{key} {direction}, filename {direction}"
+        with self._lock:
+            conn = self._get_conn()
+            rows = conn.execute(
+                f"SELECT {key}, filename, strftime('%Y-%m-%d %H:%M:%S', uploaded_at, 'unixepoch', 'localtime'),"
+                " content_hash, size, status, decision_count, stage_timings, error"
+                f" FROM documents {where} ORDER BY {order} LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        documents = [
+            {
+                "filename": filename,
+                "upload_time": upload_time,
+                "uploaded_by": "Admin",  # Placeholder for now
+                "content_hash": content_hash,
+                "size": size,
+                "status": status,
+                "decision_count": decision_count,
+                "stage_timings": json.loads(stage_timings) if stage_timings else {},
+                "error": error,
+            }
+            for _, filename, upload_time, content_hash, size, status, decision_count, stage_timings, error in rows
+        ]
+        last = (rows[-1][0], rows[-1][1]) if rows else None
+        return documents, last
+
+    def indexed_hash(self, filename: str) -> Optional[str]:
+        """
+        Content hash of the last version of filename whose ingestion
+        finished (every chunk extracted, decisions stored, stale ones removed).
+        """
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT indexed_hash FROM documents WHERE filename = ?", (filename,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._get_conn().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def stats(self) -> List[Tuple[str, int, int]]:
+        """
+        (status, documents, decisions) per ingestion status.
+        """
+        with self._lock:
+            return self._get_conn().execute(
+                "SELECT COALESCE(status, 'unknown'), COUNT(*), COALESCE(SUM(decision_count), 0)"
+                " FROM documents GROUP BY status ORDER BY status"
+            ).fetchall()
+
+    def import_directory(self, directory: str) -> int:
+        """
+        Adds files of directory that aren't in the catalog yet (uploads from
+        before the catalog existed), using their modification time as the
+        upload time. Returns the number of files added.
+        """
+        if not os.path.isdir(directory):
+            return 0
+        now = time.time()
+        rows = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stats = entry.stat()
+                rows.append((entry.name, stats.st_size, stats.st_mtime, "imported", now))
+        with self._lock:
+            conn = self._get_conn()
+            cur = conn.executemany(
+                "INSERT OR IGNORE INTO documents (filename, size, uploaded_at, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        return cur.rowcount
+
+
+def encode_page_cursor(sort: str, descending: bool, after: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"sort": sort, "desc": descending, "after": list(after)}).encode()).decode()
+
+
+def decode_page_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    """
+    The (sort key, filename) pair of an X-Next-Cursor value. A cursor only
+    continues the listing (sort and order) it came from.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        after = data["after"]
+        valid = data["sort"] == sort and data["desc"] == descending and isinstance(after, list) and len(after) == 2
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise ValueError(f"Invalid cursor for sort={sort}, order={'desc' if descending else 'asc'}: {cursor}")
+    return tuple(after)
+
+
+# Global instance
+catalog = DocumentCatalog(path=settings.CATALOG_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the document catalog behind GET /uploads/.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Documents and decisions per ingestion status")
+    sync_parser = sub.add_parser("sync", help="Add stored documents missing from the catalog")
+    sync_parser.add_argument("directory", nargs="?", default="stored_docs")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for status, documents, decisions in catalog.stats():
+            print(f"{status}: {documents} documents, {decisions} decisions")
+    elif args.command == "sync":
+        print(f"Added {catalog.import_directory(args.directory)} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Rough average for English text with Llama tokenizers.
+# We only need a budget estimate, not an exact count.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_oversized(piece: str, max_chars: int) -> List[str]:
+    """
+    Splits a single paragraph that is larger than the budget,
+    first on sentence boundaries and then hard on characters.
+    """
+    sentences = re.split(r"(?<=[.!?])\s+", piece)
+    parts = []
+    current = ""
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+class TextChunk(NamedTuple):
+    text: str
+    # Source pages the chunk was taken from (empty for plain text)
+    pages: List[int]
+
+
+def chunk_pages(pages: Iterable[Tuple[Optional[int], str]], max_tokens: int,
+                overlap_tokens: int = 0) -> Iterator[TextChunk]:
+    """
+    Streams (page number, text) pairs into chunks of at most max_tokens
+    (estimated), breaking on paragraph boundaries where possible.
+    Consecutive chunks share roughly overlap_tokens of trailing paragraphs
+    so decisions that straddle a boundary are seen whole by at least one
+    chunk. Only the chunk being built is held in memory.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+
+    def paragraphs():
+        for page, text in pages:
+            for para in re.split(r"\n\s*\n", text):
+                para = para.strip()
+                if not para:
+                    continue
+                if len(para) > max_chars:
+                    for part in _split_oversized(para, max_chars):
+                        yield page, part
+                else:
+                    yield page, para
+
+    def make_chunk(items):
+        return TextChunk(
+            text="\n\n".join(para for _, para in items),
+            pages=sorted({page for page, _ in items if page is not None})
+        )
+
+    current: List[Tuple[Optional[int], str]] = []
+    current_len = 0
+    for page, para in paragraphs():
+        if current and current_len + len(para) + 2 > max_chars:
+            yield make_chunk(current)
+            # Carry trailing paragraphs over as overlap
+            carried = []
+            carried_len = 0
+            for prev in reversed(current):
+                if carried_len + len(prev[1]) + 2 > overlap_chars:
+                    break
+                carried.insert(0, prev)
+                carried_len += len(prev[1]) + 2
+            if carried_len + len(para) + 2 > max_chars:
+                carried, carried_len = [], 0
+            current, current_len = carried, carried_len
+        current.append((page, para))
+        current_len += len(para) + 2
+
+    if current:
+        yield make_chunk(current)
+
@@ -4,6 +4,27 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+def _parse_field_weights(name: str, default: str) -> dict:
+    """
+    Parses a "field:weight,field:weight" variable (unset or empty uses
+    default). Empty entries are skipped; a malformed one raises a
+    ValueError naming the variable.
+    """
+    weights = {}
+    for entry in (os.getenv(name) or default).split(","):
+        if not entry.strip():
+            continue
+        field, sep, weight = entry.partition(":")
+        field = field.strip()
+        try:
+            if not sep or field not in ("title", "rationale", "alternatives", "outcome"):
+                raise ValueError
+            weights[field] = float(weight)
+        except ValueError:
+            raise ValueError(f"{name}: invalid entry {entry.strip()!r}, expected field:weight with field "
+                             f"one of title, rationale, alternatives, outcome") from None
+    return weights
+
 class Config:
     # API Keys
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -14,14 +35,145 @@ class Config:
     QDRANT_PATH = "qdrant_local_db"
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)
     
+    # Storage and index tuning for large collections. Applies to new collections,
+    # run `python -m backend.maintenance apply-storage-config` for existing ones
+    # none, scalar (int8, ~4x smaller) or binary (~32x smaller, needs oversampling)
+    QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+    QDRANT_PAYLOAD_ON_DISK = os.getenv("QDRANT_PAYLOAD_ON_DISK", "false").lower() == "true"
+    QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    
     # Collection Names
     COLLECTION_NAME = "institutional_memory"
     
     # Model Settings
     # Using Groq Llama 3.3
     LLM_MODEL = "llama-3.3-70b-versatile"
+    LLM_TEMPERATURE = 0.0
+
+    # Large documents are split into overlapping chunks and extracted in parallel
+    LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "6000"))
+    LLM_CHUNK_OVERLAP_TOKENS = int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "300"))
+    # Max Groq requests in flight across the whole process
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "2.0"))
+
+    # Parsed extraction results are cached on disk so unchanged text is never re-sent
+    EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "extraction_cache.db")
+    EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+    # SQLite catalog of ingested documents, listed by GET /uploads/
+    CATALOG_PATH = os.getenv("CATALOG_PATH", "document_catalog.db")
     
     # Using Local Sentence Transformer
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    # e.g. "cpu" or "cuda". None lets sentence-transformers pick
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", None)
+    # Intra-op threads of torch or ONNX Runtime, 0 keeps the library default
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+    # "torch", or "onnx" to run the model's ONNX export with ONNX Runtime on CPU
+    # (pip install "sentence-transformers[onnx]")
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    # ONNX file in the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx for
+    # the int8-quantized export. Empty uses onnx/model.onnx
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+    # Load the model and run one encode and one Qdrant query during API
+    # startup, so the server only reports ready once the first search is fast
+    EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"
+    # Load the models when backend.main is imported, so `gunicorn --preload`
+    # loads them once in the master and workers share the memory copy-on-write
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "false").lower() == "true"
+
+    # Search Settings
+    # Default minimum cosine similarity for dense hits (noise cutoff)
+    SEARCH_SCORE_THRESHOLD = float(os.getenv("SEARCH_SCORE_THRESHOLD", "0.35"))
+    # HNSW search breadth, 0 keeps the Qdrant default
+    SEARCH_HNSW_EF = int(os.getenv("SEARCH_HNSW_EF", "0"))
+    # Quantized searches re-score oversampling * limit candidates with the original vectors
+    SEARCH_QUANTIZATION_RESCORE = os.getenv("SEARCH_QUANTIZATION_RESCORE", "true").lower() == "true"
+    SEARCH_QUANTIZATION_OVERSAMPLING = float(os.getenv("SEARCH_QUANTIZATION_OVERSAMPLING", "2.0"))
+    SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "100"))
+    # Results fetched from Qdrant per round trip by /search/stream
+    SEARCH_STREAM_PAGE_SIZE = int(os.getenv("SEARCH_STREAM_PAGE_SIZE", "50"))
+    # Cache of whole /search/ responses, invalidated by any write to Qdrant
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_MAX_MB = int(os.getenv("SEARCH_CACHE_MAX_MB", "64"))
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))
+    # Version file of the in-process cache, shared by the workers and CLIs
+    # started from the same directory
+    SEARCH_CACHE_VERSION_PATH = os.getenv("SEARCH_CACHE_VERSION_PATH", "search_cache.version")
+    # e.g. redis://localhost:6379/0 to share the cache (and its version) across
+    # workers and CLI ingestion (pip install redis)
+    SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL", "")
+    # Cache of query text -> embedding
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+    # Hybrid search fetches limit * factor candidates from each of dense and sparse
+    HYBRID_PREFETCH_FACTOR = int(os.getenv("HYBRID_PREFETCH_FACTOR", "4"))
+    # Typical decision length in tokens, the BM25 length normalisation pivot
+    SPARSE_AVG_DOC_TOKENS = int(os.getenv("SPARSE_AVG_DOC_TOKENS", "250"))
+
+    # Per-field vectors (title, rationale paragraphs, alternatives, outcome) in a
+    # companion collection, for "mode": "fields" searches. Existing decisions
+    # need `python -m backend.maintenance build-field-index` once
+    FIELD_VECTORS_ENABLED = os.getenv("FIELD_VECTORS_ENABLED", "false").lower() == "true"
+    # Default field weights for field search, as field:weight pairs
+    FIELD_WEIGHTS = _parse_field_weights("FIELD_WEIGHTS", "title:1.0,rationale:1.0,alternatives:0.9,outcome:0.8")
+
+    # Cross-encoder re-ranking of the top RERANK_CANDIDATES hits
+    # Used when a query doesn't set "rerank" itself
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+    # Past this, results keep the retrieval order. 0 disables the budget
+    RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "300"))
+    # Cached (query, decision) pair scores
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+    # Adds a Server-Timing header with per-stage timings to every response
+    METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "false").lower() == "true"
+
+    # Points per Qdrant upsert request during bulk uploads
+    QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+
+    # Cross-document consolidation of near-duplicate decisions at ingestion
+    # At or above DEDUP_MERGE_THRESHOLD (cosine) a new decision is merged into
+    # the stored one, at or above DEDUP_GROUP_THRESHOLD it shares its decision_key
+    # (one result per key with "group_by_decision": true)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+    DEDUP_MERGE_THRESHOLD = float(os.getenv("DEDUP_MERGE_THRESHOLD", "0.95"))
+    DEDUP_GROUP_THRESHOLD = float(os.getenv("DEDUP_GROUP_THRESHOLD", "0.85"))
+    # Stored neighbours compared with each new decision
+    DEDUP_CANDIDATES = int(os.getenv("DEDUP_CANDIDATES", "3"))
+
+    # Index snapshots (python -m backend.snapshot)
+    # Points per scroll page on export and per upsert batch on import
+    SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1024"))
+    # Batches upserted in parallel on import (embedded Qdrant always uses one)
+    SNAPSHOT_IMPORT_WORKERS = int(os.getenv("SNAPSHOT_IMPORT_WORKERS", "4"))
+
+    # Ingestion Queue
+    # Uploads are processed by a bounded pool of background workers
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "100"))
+    INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+
+    # PDFs with at least this many pages are split into page ranges
+    # extracted by PDF_WORKERS processes
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+
+    # Bulk Loader (python -m backend.bulk_ingest)
+    BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 2)))
+    # Documents in LLM extraction at once. Groq requests are still capped by LLM_CONCURRENCY
+    BULK_LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", os.getenv("LLM_CONCURRENCY", "4")))
+    BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "512"))
+    BULK_CHECKPOINT_PATH = os.getenv("BULK_CHECKPOINT_PATH", "bulk_ingest_checkpoint.jsonl")
 
 settings = Config()
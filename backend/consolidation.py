@@ -0,0 +1,222 @@
+import logging
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from backend.config import settings
+from backend.qdrant_client_wrapper import db_client
+
+logger = logging.getLogger(__name__)
+
+# Payload fields a new decision is merged or grouped on
+SOURCE_FIELDS = ["source_file", "source_files", "source_versions", "content_hash", "tags", "decision_key"]
+
+
+def source_version(source_file: str, content_hash: str) -> str:
+    return f"{source_file}:{content_hash}"
+
+
+def _version_file(version: str) -> str:
+    return version.rsplit(":", 1)[0]
+
+
+def _union(first: List[str], second: List[str]) -> List[str]:
+    merged = list(first or [])
+    for value in second or []:
+        if value not in merged:
+            merged.append(value)
+    return merged
+
+
+def decision_key(payload: dict, point_id) -> str:
+    # Points stored before consolidation are their own group
+    return payload.get("decision_key") or str(point_id)
+
+
+def source_files(payload: dict) -> List[str]:
+    return payload.get("source_files") or ([payload["source_file"]] if payload.get("source_file") else [])
+
+
+def source_versions(payload: dict) -> List[str]:
+    if payload.get("source_versions"):
+        return list(payload["source_versions"])
+    if payload.get("source_file") and payload.get("content_hash"):
+        return [source_version(payload["source_file"], payload["content_hash"])]
+    return []
+
+
+def merge_sources(target: dict, payload: dict) -> dict:
+    """
+    Adds the documents, versions and tags of payload to target (the
+    SOURCE_FIELDS of a stored or new decision). A document's older version
+    is replaced by the one in payload.
+    """
+    files = source_files(payload)
+    versions = source_versions(payload)
+    replaced = {_version_file(version) for version in versions}
+    target["source_files"] = _union(target["source_files"], files)
+    target["source_versions"] = [v for v in target["source_versions"] if _version_file(v) not in replaced] + versions
+    target["tags"] = _union(target["tags"], payload.get("tags"))
+    return target
+
+
+def _sources(payload: dict) -> dict:
+    return {
+        "source_files": source_files(payload),
+        "source_versions": source_versions(payload),
+        "tags": list(payload.get("tags") or []),
+    }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def consolidate_batch(ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> Tuple[List[int], List[str], Dict[str, dict]]:
+    """
+    Matches new decisions against the stored ones and each other before
+    they are uploaded. A decision at least DEDUP_MERGE_THRESHOLD similar to
+    a decision of another document is merged into it (which gains its
+    source file, version and tags); one at least DEDUP_GROUP_THRESHOLD
+    similar takes its decision_key. Payloads of the decisions still to
+    upload are updated in place.
+
+    Returns the indices of the decisions to upload, the point id each
+    decision ended up in, and the payload updates of stored points.
+    """
+    requests = [
+        db_client.dense_request(vector.tolist(), limit=settings.DEDUP_CANDIDATES,
+                                score_threshold=settings.DEDUP_GROUP_THRESHOLD, with_payload=SOURCE_FIELDS)
+        for vector in vectors
+    ]
+    hit_lists = db_client.query_batch(requests)
+    normalized = _normalize(np.asarray(vectors, dtype=np.float32))
+    similarity = normalized @ normalized.T
+
+    keep, final_ids, updates = [], [], {}
+    for i, (decision_id, payload, hits) in enumerate(zip(ids, payloads, hit_lists)):
+        filename = payload["source_file"]
+        own = next((hit for hit in hits if str(hit.id) == decision_id), None)
+        if own is not None:
+            # Re-ingested unchanged: keep what other documents merged into it
+            merge_sources(payload, {**_sources(own.payload), "source_versions": [
+                v for v in source_versions(own.payload) if _version_file(v) != filename]})
+            payload["decision_key"] = decision_key(own.payload, own.id)
+            keep.append(i)
+            final_ids.append(decision_id)
+            continue
+
+        # Older versions of this same document are cleaned up, not merged into
+        stored = next((hit for hit in hits if str(hit.id) != decision_id
+                       and set(source_files(hit.payload)) - {filename}), None)
+        stored_score = stored.score if stored is not None else -1.0
+        # Only decisions of other documents; one meeting's similar decisions stay distinct
+        others = [j for j in keep if payloads[j]["source_file"] != filename]
+        earlier = max(others, key=lambda j: similarity[i, j], default=None)
+        earlier_score = float(similarity[i, earlier]) if earlier is not None else -1.0
+
+        if max(stored_score, earlier_score) >= settings.DEDUP_MERGE_THRESHOLD:
+            if stored_score >= earlier_score:
+                target_id = str(stored.id)
+                if target_id not in updates:
+                    updates[target_id] = _sources(stored.payload)
+                merge_sources(updates[target_id], payload)
+            else:
+                target_id = ids[earlier]
+                merge_sources(payloads[earlier], payload)
+            final_ids.append(target_id)
+            continue
+
+        if stored_score >= settings.DEDUP_GROUP_THRESHOLD and stored_score >= earlier_score:
+            payload["decision_key"] = decision_key(stored.payload, stored.id)
+        elif earlier_score >= settings.DEDUP_GROUP_THRESHOLD:
+            payload["decision_key"] = payloads[earlier]["decision_key"]
+        keep.append(i)
+        final_ids.append(decision_id)
+
+    merged = len(ids) - len(keep)
+    if merged:
+        logger.info(f"Merged {merged} of {len(ids)} decisions into near-duplicates")
+    return keep, final_ids, updates
+
+
+def collapse_groups(items: list, hit_of: Callable = lambda item: item) -> list:
+    """
+    Keeps the first (best) item of each decision_key, for group_by_decision
+    search. hit_of gets the Qdrant hit of an item.
+    """
+    seen = set()
+    collapsed = []
+    for item in items:
+        hit = hit_of(item)
+        key = decision_key(hit.payload or {}, hit.id)
+        if key not in seen:
+            seen.add(key)
+            collapsed.append(item)
+    return collapsed
+
+
+def _dense_vector(point) -> list:
+    return point.vector.get("") if isinstance(point.vector, dict) else point.vector
+
+
+def consolidate_collection(batch_size: int = 128) -> Tuple[int, int]:
+    """
+    Consolidates decisions stored before DEDUP_ENABLED (or with other
+    thresholds): near-duplicates are merged into the first of them in scroll
+    order and deleted, similar ones get its decision_key, and every point
+    gets source_files, source_versions and decision_key.
+    Returns (points merged away, points regrouped).
+    """
+    merged, grouped = 0, 0
+    # Points already processed keep their place, later duplicates merge into them
+    processed, removed = set(), set()
+    offset = None
+    while True:
+        points, offset = db_client.client.scroll(
+            collection_name=db_client.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=SOURCE_FIELDS,
+            with_vectors=True
+        )
+        points = [point for point in points if str(point.id) not in removed]
+        requests = [
+            db_client.dense_request(_dense_vector(point), limit=settings.DEDUP_CANDIDATES + 1,
+                                    score_threshold=settings.DEDUP_GROUP_THRESHOLD, with_payload=SOURCE_FIELDS)
+            for point in points
+        ]
+        updates, keys, deleted = {}, {}, []
+        for point, hits in zip(points, db_client.query_batch(requests)):
+            point_id = str(point.id)
+            if point_id in removed:
+                continue
+            processed.add(point_id)
+            key = keys.pop(point_id, None) or decision_key(point.payload, point_id)
+            sources = _sources(point.payload)
+            own_files = set(sources["source_files"])
+            for hit in hits:
+                hit_id = str(hit.id)
+                if hit_id in processed or hit_id in removed:
+                    continue
+                if not set(source_files(hit.payload)) - own_files:
+                    # Decisions of the same document are never merged or grouped
+                    continue
+                if hit.score >= settings.DEDUP_MERGE_THRESHOLD:
+                    merge_sources(sources, hit.payload)
+                    removed.add(hit_id)
+                    keys.pop(hit_id, None)
+                    deleted.append(hit.id)
+                elif decision_key(hit.payload, hit_id) == hit_id and hit_id not in keys:
+                    keys[hit_id] = key
+            updates[point.id] = {**sources, "decision_key": key}
+        # Neighbours in later batches keep the key they were given here
+        for point_id, key in keys.items():
+            updates[point_id] = {"decision_key": key}
+        grouped += len(keys)
+        db_client.set_payloads(updates)
+        db_client.delete_points(deleted)
+        merged += len(deleted)
+        if offset is None:
+            break
+    return merged, grouped
@@ -0,0 +1,149 @@
+import hashlib
+import multiprocessing
+import re
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+from pypdf import PdfReader
+from backend.config import settings
+
+# Kept free of model / LLM imports so it is cheap to load in worker processes
+
+# (page number, text). Page is None for plain text files.
+Page = Tuple[Optional[int], str]
+
+# Plain text files are streamed in blocks of roughly this many characters
+TEXT_BLOCK_CHARS = 256 * 1024
+# Blocks without a blank line are cut at a line end past this, and text
+# without line breaks at a sentence end (or whitespace)
+TEXT_BLOCK_MAX_CHARS = 2 * TEXT_BLOCK_CHARS
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+# Worker processes start from a clean interpreter, not a fork of a process
+# running threads (and holding torch)
+PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every large PDF extracted in this process.
+    Workers are started on first use.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS, mp_context=PROCESS_CONTEXT)
+        return _pdf_pool
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=True, cancel_futures=True)
+            _pdf_pool = None
+
+def _page_text(page) -> str:
+    # extract_text() returns None for pages without a text layer (scans, images)
+    return page.extract_text() or ""
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> List[Page]:
+    """
+    Extracts pages [start, end) of a PDF. Runs in worker processes.
+    """
+    reader = PdfReader(file_path)
+    return [(i + 1, _page_text(reader.pages[i])) for i in range(start, min(end, len(reader.pages)))]
+
+def iter_pdf_pages(file_path: str, pool: Optional[Executor] = None) -> Iterator[Page]:
+    """
+    Yields the pages of a PDF one at a time. Large PDFs (or any PDF when a
+    pool is given) are split into page ranges extracted by worker processes
+    (the shared PDF pool by default), with a bounded number of ranges in
+    flight so memory stays flat.
+    """
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+
+    if pool is None and settings.PDF_WORKERS > 1 and page_count >= settings.PDF_PARALLEL_MIN_PAGES:
+        pool = get_pdf_pool()
+
+    if pool is None:
+        for i, page in enumerate(reader.pages):
+            yield i + 1, _page_text(page)
+        return
+
+    step = settings.PDF_PAGES_PER_TASK
+    ranges = iter(range(0, page_count, step))
+    max_in_flight = settings.PDF_WORKERS * 2
+    pending = deque()
+    try:
+        for start in ranges:
+            pending.append(pool.submit(extract_pdf_page_range, file_path, start, start + step))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            start = next(ranges, None)
+            if start is not None:
+                pending.append(pool.submit(extract_pdf_page_range, file_path, start, start + step))
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _cut_position(text: str) -> int:
+    # After the last sentence end, else the last whitespace, else the end
+    cut = None
+    for match in _SENTENCE_END.finditer(text):
+        cut = match.end()
+    if cut is None:
+        cut = max(text.rfind(" "), text.rfind("\t")) + 1
+    return cut or len(text)
+
+def iter_text_blocks(file_path: str) -> Iterator[Page]:
+    """
+    Yields a text file in blocks that end on a blank line where possible,
+    otherwise on a line end, or a sentence end for text without line breaks,
+    so no block grows much past TEXT_BLOCK_MAX_CHARS.
+    """
+    block = []
+    size = 0
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            # Bounded read, a file without line breaks is not loaded at once
+            line = f.readline(TEXT_BLOCK_MAX_CHARS)
+            if not line:
+                break
+            block.append(line)
+            size += len(line)
+            if size < TEXT_BLOCK_CHARS:
+                continue
+            if not line.strip() or (size >= TEXT_BLOCK_MAX_CHARS and line.endswith("\n")):
+                yield None, "".join(block)
+                block, size = [], 0
+            elif size >= TEXT_BLOCK_MAX_CHARS:
+                text = "".join(block)
+                cut = _cut_position(text)
+                yield None, text[:cut]
+                block = [text[cut:]] if cut < len(text) else []
+                size = len(text) - cut
+    if block:
+        yield None, "".join(block)
+
+def iter_document_pages(file_path: str, pool: Optional[Executor] = None) -> Iterator[Page]:
+    if file_path.endswith(".pdf"):
+        return iter_pdf_pages(file_path, pool)
+    return iter_text_blocks(file_path)
+
+def extract_text_from_pdf(file_path: str) -> str:
+    return "\n".join(text for _, text in iter_pdf_pages(file_path))
+
+def file_hash(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """
+    Process-wide embedding model shared by ingestion and retrieval.
+    The SentenceTransformer is only loaded on first use (or by warm()),
+    so code paths that never embed don't pay for it. backend="onnx" runs
+    the model's ONNX export (onnx_file, e.g. an int8-quantized one) with
+    ONNX Runtime on CPU instead of PyTorch.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None, num_threads: int = 0,
+                 backend: str = "torch", onnx_file: Optional[str] = None):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown embedding backend: {backend} (expected torch or onnx)")
+        self.model_name = model_name
+        self.device = device
+        self.num_threads = num_threads
+        self.backend = backend
+        self.onnx_file = onnx_file or None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        start = time.perf_counter()
+        from sentence_transformers import SentenceTransformer
+        # This downloads the model to ~/.cache/torch/sentence_transformers on first run
+        if self.backend == "onnx":
+            model = SentenceTransformer(self.model_name, device=self.device, backend="onnx",
+                                        model_kwargs=self._onnx_kwargs())
+        else:
+            if self.num_threads:
+                import torch
+                torch.set_num_threads(self.num_threads)
+            model = SentenceTransformer(self.model_name, device=self.device)
+        logger.info(f"Loaded embedding model {self.model_name} ({self.describe()}) on {model.device} "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return model
+
+    def _onnx_kwargs(self) -> dict:
+        kwargs = {"provider": "CPUExecutionProvider"}
+        if self.onnx_file:
+            kwargs["file_name"] = self.onnx_file
+        if self.num_threads:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            kwargs["session_options"] = options
+        return kwargs
+
+    def describe(self) -> str:
+        return f"onnx {self.onnx_file or 'onnx/model.onnx'}" if self.backend == "onnx" else "torch"
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Embeds a list of texts. Returns a float32 array of shape (len(texts), dim).
+        """
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+    def warm(self) -> np.ndarray:
+        """
+        Loads the model and runs one dummy encode so the first real
+        request doesn't pay for lazy initialisation. Returns the vector.
+        """
+        return self.encode_one("warm up")
+
+
+# Global instance
+embedder = EmbeddingProvider(
+    model_name=settings.EMBEDDING_MODEL,
+    device=settings.EMBEDDING_DEVICE,
+    num_threads=settings.EMBEDDING_THREADS,
+    backend=settings.EMBEDDING_BACKEND,
+    onnx_file=settings.EMBEDDING_ONNX_FILE
+)
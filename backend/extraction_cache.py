@@ -0,0 +1,234 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from backend.config import settings
+
+# Lookups record hits and LRU touches in memory, written in one
+# transaction every this many lookups or seconds (and on every put)
+TOUCH_FLUSH_LOOKUPS = 100
+TOUCH_FLUSH_SECONDS = 5.0
+
+
+def normalize_text(text: str) -> str:
+    # Whitespace differences (PDF re-extraction, CRLF, trailing spaces)
+    # should not cause a cache miss
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(text: str, prompt_version: str, model: str, temperature: float) -> str:
+    h = hashlib.sha256()
+    for part in (prompt_version, model, repr(float(temperature)), normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of parsed LLM extraction results, keyed by a hash of the
+    normalized chunk text, prompt version, model and temperature.
+    Entries are evicted least-recently-used once max_bytes is exceeded.
+    """
+
+    def __init__(self, path: str, max_bytes: int, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._pending = {"hits": 0, "misses": 0}
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+            # Running total of entries.size, so eviction doesn't sum the table on every put
+            if conn.execute("SELECT 1 FROM counters WHERE name = 'bytes'").fetchone() is None:
+                conn.execute("INSERT INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+            conn.executescript(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN"
+                " UPDATE counters SET value = value + NEW.size WHERE name = 'bytes'; END;"
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN"
+                " UPDATE counters SET value = value - OLD.size WHERE name = 'bytes'; END;"
+                "CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN"
+                " UPDATE counters SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END;"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.hits += 1
+                self._touched[key] = time.time()
+            else:
+                self.misses += 1
+            self._pending["hits" if row else "misses"] += 1
+            if (sum(self._pending.values()) >= TOUCH_FLUSH_LOOKUPS
+                    or time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS):
+                self._flush(conn)
+                conn.commit()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, items: List[dict]):
+        if not self.enabled:
+            return
+        value = json.dumps(items)
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET"
+                " value = excluded.value, size = excluded.size, created_at = excluded.created_at,"
+                " last_access = excluded.last_access",
+                (key, value, len(value), now, now)
+            )
+            # Before evicting, so recently read entries aren't taken for stale ones
+            self._flush(conn)
+            self._evict(conn)
+            conn.commit()
+
+    def flush(self):
+        """
+        Writes the pending hit/miss counts and LRU touches.
+        """
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush(self._conn)
+            self._conn.commit()
+
+    def _flush(self, conn: sqlite3.Connection):
+        if self._touched:
+            conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                             [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+        for counter, count in self._pending.items():
+            if count:
+                conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (count, counter))
+                self._pending[counter] = 0
+        self._last_flush = time.monotonic()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._get_conn()
+            self._flush(conn)
+            conn.commit()
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": counters["bytes"],
+            "max_bytes": self.max_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def list_entries(self, limit: int = 20) -> List[tuple]:
+        with self._lock:
+            conn = self._get_conn()
+            self._flush(conn)
+            conn.commit()
+            return conn.execute(
+                "SELECT key, size, created_at, last_access FROM entries ORDER BY last_access DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def purge(self, older_than_days: Optional[float] = None) -> int:
+        with self._lock:
+            conn = self._get_conn()
+            self._flush(conn)
+            if older_than_days is None:
+                cur = conn.execute("DELETE FROM entries")
+                conn.execute("UPDATE counters SET value = 0")
+            else:
+                cutoff = time.time() - older_than_days * 86400
+                cur = conn.execute("DELETE FROM entries WHERE last_access < ?", (cutoff,))
+            conn.commit()
+            removed = cur.rowcount
+            conn.execute("VACUUM")
+        return removed
+
+
+# Global instance
+extraction_cache = ExtractionCache(
+    path=settings.EXTRACTION_CACHE_PATH,
+    max_bytes=settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+    enabled=settings.EXTRACTION_CACHE_ENABLED
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or purge the LLM extraction cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show size and hit/miss counters")
+    list_parser = sub.add_parser("list", help="Show the most recently used entries")
+    list_parser.add_argument("--limit", type=int, default=20)
+    purge_parser = sub.add_parser("purge", help="Delete cached entries")
+    purge_parser.add_argument("--older-than-days", type=float, default=None,
+                              help="Only delete entries not used for this many days")
+    args = parser.parse_args()
+
+    if not os.path.exists(extraction_cache.path):
+        print(f"No extraction cache at {extraction_cache.path}")
+        return
+
+    if args.command == "stats":
+        for name, value in extraction_cache.stats().items():
+            print(f"{name}: {value}")
+    elif args.command == "list":
+        for key, size, created_at, last_access in extraction_cache.list_entries(args.limit):
+            used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_access))
+            print(f"{key[:16]}  {size:>9} bytes  last used {used}")
+    elif args.command == "purge":
+        removed = extraction_cache.purge(args.older_than_days)
+        print(f"Removed {removed} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from typing import Dict, List
+
+import numpy as np
+
+# Named vectors of the fields collection. True marks multi-vector fields,
+# which hold one vector per paragraph and are scored by their best match (MAX_SIM)
+FIELD_VECTORS = {
+    "title": False,
+    "rationale": True,
+    "alternatives": True,
+    "outcome": False,
+}
+
+
+def build_field_texts(decision) -> Dict[str, List[str]]:
+    """
+    The texts embedded for each field of a decision. Empty fields have no
+    vector, so the decision simply never matches on them.
+    """
+    return {
+        "title": [decision.decision_title],
+        "rationale": [p for p in decision.rationale if p.strip()],
+        "alternatives": [a for a in decision.alternatives if a.strip()],
+        "outcome": [decision.outcome] if decision.outcome and decision.outcome.strip() else [],
+    }
+
+
+def flatten_field_texts(field_texts: List[Dict[str, List[str]]]) -> List[str]:
+    """
+    All field texts of many decisions in one list, for a single embedding pass.
+    """
+    return [text for fields in field_texts for name in FIELD_VECTORS for text in fields[name]]
+
+
+def group_field_vectors(field_texts: List[Dict[str, List[str]]], vectors: np.ndarray) -> List[dict]:
+    """
+    Splits the vectors of flatten_field_texts back into one named-vector
+    dict per decision.
+    """
+    grouped = []
+    i = 0
+    for fields in field_texts:
+        named = {}
+        for name, multi in FIELD_VECTORS.items():
+            count = len(fields[name])
+            if count:
+                named[name] = vectors[i:i + count].tolist() if multi else vectors[i].tolist()
+            i += count
+        grouped.append(named)
+    return grouped
+
+
+def fuse_field_hits(hits_by_field: Dict[str, list], weights: Dict[str, float], limit: int,
+                    score_threshold: float = None) -> List[tuple]:
+    """
+    Scores each decision by its best weighted field match, so a strong hit
+    on a single field (e.g. a rejected alternative) is enough to surface it.
+    Returns (point id, score) pairs, best first.
+    """
+    scores = {}
+    for field, hits in hits_by_field.items():
+        weight = weights[field]
+        for hit in hits:
+            score = weight * hit.score
+            if score > scores.get(hit.id, float("-inf")):
+                scores[hit.id] = score
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if score_threshold is not None:
+        ranked = [(point_id, score) for point_id, score in ranked if score >= score_threshold]
+    return ranked[:limit]
@@ -1,40 +1,50 @@
+import hashlib
 import json
+import os
+import random
+import re
+import threading
+import time
 import uuid
 import logging
-from typing import List
-from pypdf import PdfReader
-from groq import Groq
-from sentence_transformers import SentenceTransformer
+from collections import defaultdict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
 from backend.config import settings
-from backend.models import DecisionNode
+from backend.chunking import TextChunk, chunk_pages
+from backend.documents import iter_document_pages, file_hash
+from backend.embeddings import embedder
+from backend.sparse import encode_documents, document_text
+from backend.field_vectors import build_field_texts, flatten_field_texts, group_field_vectors
+from backend.extraction_cache import extraction_cache, cache_key
+from backend.catalog import catalog
+from backend.consolidation import consolidate_batch, source_version
+from backend.metrics import llm_request_seconds, llm_retries, llm_tokens, extraction_cache_lookups
+from backend.models import DecisionNode, decision_day
 from backend.qdrant_client_wrapper import db_client
-from qdrant_client.http import models
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Groq Client
-groq_client = Groq(api_key=settings.GROQ_API_KEY)
+# Groq client, built on first use so importing this module doesn't load the SDK
+groq_client = None
+_groq_lock = threading.Lock()
 
-# Configure Local Embedding Model
-# This downloads the model to ~/.cache/torch/sentence_transformers on first run
-embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+# Bounds the number of Groq requests in flight across all ingestion workers
+_llm_slots = threading.BoundedSemaphore(settings.LLM_CONCURRENCY)
 
-def extract_text_from_pdf(file_path: str) -> str:
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+# Bump whenever _build_prompt or _parse_decisions changes so cached
+# extraction results from the old prompt are not reused
+PROMPT_VERSION = "1"
 
-def extract_decisions_using_llm(text: str, filename: str) -> List[DecisionNode]:
-    """
-    Uses Groq (Llama 3) to parse the raw text and extract structured decision data.
-    """
-    logger.info(f"Extracting decisions from {filename} using Groq...")
-    
-    prompt = f"""
+# Namespace for deterministic point ids (uuid5)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2d4e-8a3b-5c7d-9e0f-1a2b3c4d5e6f")
+
+def _build_prompt(text: str) -> str:
+    return f"""
     You are a Senior Technical Auditor. Your job is to extract detailed decision records.
     
     CRITICAL INSTRUCTION: THE USER WANTS EXTREME VERBOSITY.
@@ -45,7 +55,7 @@ def extract_decisions_using_llm(text: str, filename: str) -> List[DecisionNode]:
     - PREFER LONG, DETAILED SENTENCES over short ones.
 
     Input Text:
-    {text[:100000]}
+    {text}
 
     Return a JSON list of objects with this EXACT structure:
     {{
@@ -62,127 +72,437 @@ def extract_decisions_using_llm(text: str, filename: str) -> List[DecisionNode]:
     }}
     """
 
-    try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that outputs raw JSON without markdown code fences."
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=settings.LLM_MODEL,
-            temperature=0,
-            # response_format={"type": "json_object"} # Groq supports this for Llama 3.1, for 3 it's safer to prompt
-        )
-
-        content = chat_completion.choices[0].message.content
-        
-        # Clean up potential markdown code blocks if the model ignores instruction
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-             content = content.replace("```", "")
-            
-        data = json.loads(content)
+def get_groq_client():
+    global groq_client
+    if groq_client is None:
+        with _groq_lock:
+            if groq_client is None:
+                from groq import Groq
+                # Retries are handled by _call_groq so they can respect LLM_CONCURRENCY
+                groq_client = Groq(api_key=settings.GROQ_API_KEY, max_retries=0)
+    return groq_client
+
+def _retryable_errors() -> tuple:
+    from groq import RateLimitError, APIConnectionError, InternalServerError
+    return (RateLimitError, APIConnectionError, InternalServerError)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a Groq call. Honours the Retry-After
+    header on rate-limit responses, otherwise backs off exponentially.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    delay = settings.LLM_RETRY_BASE_DELAY * (2 ** attempt)
+    return delay + random.uniform(0, delay / 2)
+
+def _call_groq(prompt: str) -> str:
+    """
+    Sends one prompt to Groq, retrying rate limits and transient failures.
+    """
+    client = get_groq_client()
+    retryable_errors = _retryable_errors()
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            with _llm_slots, llm_request_seconds.time():
+                chat_completion = client.chat.completions.create(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful assistant that outputs raw JSON without markdown code fences."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt,
+                        }
+                    ],
+                    model=settings.LLM_MODEL,
+                    temperature=settings.LLM_TEMPERATURE,
+                    # response_format={"type": "json_object"} # Groq supports this for Llama 3.1, for 3 it's safer to prompt
+                )
+            usage = chat_completion.usage
+            if usage is not None:
+                llm_tokens.inc(usage.prompt_tokens or 0, kind="prompt")
+                llm_tokens.inc(usage.completion_tokens or 0, kind="completion")
+            return chat_completion.choices[0].message.content
+        except retryable_errors as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise
+            llm_retries.inc(error=type(e).__name__)
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"Groq call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def _parse_decisions(content: str, filename: str) -> List[DecisionNode]:
+    # Clean up potential markdown code blocks if the model ignores instruction
+    if "```json" in content:
+        content = content.replace("```json", "").replace("```", "")
+    elif "```" in content:
+         content = content.replace("```", "")
         
-        nodes_data = data if isinstance(data, list) else []
+    data = json.loads(content)
+    
+    nodes_data = data if isinstance(data, list) else []
+    
+    # Handle dict wrapper
+    if isinstance(data, dict):
+         if "decisions" in data:
+             nodes_data = data["decisions"]
+         elif "Decision Logs" in data: # Handle potential key variation
+             nodes_data = data["Decision Logs"]
+         elif "decision_title" in data: # Handle raw single object
+             nodes_data = [data]
+         else:
+             for val in data.values():
+                 if isinstance(val, list):
+                     nodes_data = val
+                     break
+
+    results = []
+    for item in nodes_data:
+        item["source_file"] = filename
         
-        # Handle dict wrapper
-        if isinstance(data, dict):
-             if "decisions" in data:
-                 nodes_data = data["decisions"]
-             elif "Decision Logs" in data: # Handle potential key variation
-                 nodes_data = data["Decision Logs"]
-             elif "decision_title" in data: # Handle raw single object
-                 nodes_data = [data]
+        # Ensure rationale is a list (handle LLM inconsistency)
+        if "rationale" in item and isinstance(item["rationale"], str):
+             # Split by bullets or just wrap
+             rationale_text = item["rationale"]
+             if "\n-" in rationale_text:
+                 item["rationale"] = [x.strip("-").strip() for x in rationale_text.split("\n") if x.strip()]
              else:
-                 for val in data.values():
-                     if isinstance(val, list):
-                         nodes_data = val
-                         break
-
-        results = []
-        for item in nodes_data:
-            item["source_file"] = filename
-            
-            # Ensure rationale is a list (handle LLM inconsistency)
-            if "rationale" in item and isinstance(item["rationale"], str):
-                 # Split by bullets or just wrap
-                 rationale_text = item["rationale"]
-                 if "\n-" in rationale_text:
-                     item["rationale"] = [x.strip("-").strip() for x in rationale_text.split("\n") if x.strip()]
-                 else:
-                     item["rationale"] = [rationale_text]
-
-            # Ensure alternatives are strings (handle LLM returning objects)
-            if "alternatives" in item and isinstance(item["alternatives"], list):
-                new_alts = []
-                for x in item["alternatives"]:
-                    if isinstance(x, dict):
-                        # Flatten complex object to string
-                        name = x.get('name', 'Option')
-                        reason = x.get('reason_rejected', x.get('description', ''))
-                        new_alts.append(f"{name}: {reason}")
-                    else:
-                        new_alts.append(str(x))
-                item["alternatives"] = new_alts
-            
-            node = DecisionNode(**item)
-            results.append(node)
-        return results
+                 item["rationale"] = [rationale_text]
+
+        # Ensure alternatives are strings (handle LLM returning objects)
+        if "alternatives" in item and isinstance(item["alternatives"], list):
+            new_alts = []
+            for x in item["alternatives"]:
+                if isinstance(x, dict):
+                    # Flatten complex object to string
+                    name = x.get('name', 'Option')
+                    reason = x.get('reason_rejected', x.get('description', ''))
+                    new_alts.append(f"{name}: {reason}")
+                else:
+                    new_alts.append(str(x))
+            item["alternatives"] = new_alts
+        
+        node = DecisionNode(**item)
+        results.append(node)
+    return results
+
+def extract_decisions_from_chunk(text: str, filename: str, pages: Optional[List[int]] = None) -> List[DecisionNode]:
+    """
+    Runs a single extraction prompt over one chunk of text.
+    Results are served from the extraction cache when the chunk was seen before.
+    """
+    pages = pages or []
+    key = cache_key(text, PROMPT_VERSION, settings.LLM_MODEL, settings.LLM_TEMPERATURE)
+    cached = extraction_cache.get(key)
+    extraction_cache_lookups.inc(result="miss" if cached is None else "hit")
+    if cached is not None:
+        return [DecisionNode(**item, source_file=filename, source_pages=pages) for item in cached]
 
+    # Groq errors and unparseable output (e.g. an answer cut off at max
+    # tokens) propagate, so the document fails as a whole and is retried
+    # instead of being indexed without this chunk
+    content = _call_groq(_build_prompt(text))
+    try:
+        decisions = _parse_decisions(content, filename)
     except Exception as e:
-        logger.error(f"Failed to parse Groq output: {e}\nRaw content: {content if 'content' in locals() else 'N/A'}")
-        return []
+        logger.error(f"Failed to parse Groq output: {e}\nRaw content: {content}")
+        raise ValueError(f"Unparseable extraction output for a chunk of {filename}: {e}") from e
+    extraction_cache.put(key, [d.model_dump(exclude={"source_file", "source_pages", "source_files"}) for d in decisions])
+    for decision in decisions:
+        decision.source_pages = pages
+    return decisions
+
+def _normalize_title(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", title.lower()).strip()
 
-def embed_text(text: str) -> List[float]:
+def _union(first: List[str], second: List[str]) -> List[str]:
+    seen = {x.strip().lower() for x in first}
+    merged = list(first)
+    for x in second:
+        if x.strip().lower() not in seen:
+            seen.add(x.strip().lower())
+            merged.append(x)
+    return merged
+
+def merge_decisions(decisions: List[DecisionNode]) -> List[DecisionNode]:
     """
-    Generates embedding using local SentenceTransformer model.
-    Returns a list of floats (size 384 for all-MiniLM-L6-v2).
+    Collapses decisions extracted more than once (e.g. from overlapping
+    chunks) into one node, keeping the union of their details.
     """
-    return embedding_model.encode(text).tolist()
+    merged = {}
+    for decision in decisions:
+        key = _normalize_title(decision.decision_title)
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = decision.model_copy(deep=True)
+            continue
+        existing.rationale = _union(existing.rationale, decision.rationale)
+        existing.alternatives = _union(existing.alternatives, decision.alternatives)
+        existing.tags = _union(existing.tags, decision.tags)
+        if not existing.outcome:
+            existing.outcome = decision.outcome
+        existing.source_pages = sorted(set(existing.source_pages) | set(decision.source_pages))
+    return list(merged.values())
 
-def ingest_file(file_path: str):
-    filename = file_path.split("/")[-1] 
-    
-    # 1. Extract Text
-    if file_path.endswith(".pdf"):
-        text = extract_text_from_pdf(file_path)
-    else:
-        with open(file_path, "r", encoding="utf-8") as f:
-            text = f.read()
+def extract_decisions_from_chunks(chunks: Iterable[TextChunk], filename: str) -> List[DecisionNode]:
+    """
+    Extracts decisions from a stream of chunks concurrently (bounded by
+    LLM_CONCURRENCY) and merges them. The stream is consumed lazily, so only
+    a few chunks are held in memory however long the document is.
+    """
+    decisions = []
+    chunk_count = 0
+    max_in_flight = settings.LLM_CONCURRENCY * 2
+    with ThreadPoolExecutor(max_workers=settings.LLM_CONCURRENCY) as pool:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(extract_decisions_from_chunk, chunk.text, filename, chunk.pages))
+                chunk_count += 1
+                if len(pending) >= max_in_flight:
+                    decisions.extend(pending.popleft().result())
+            while pending:
+                decisions.extend(pending.popleft().result())
+        except BaseException:
+            # The document has failed, don't spend LLM calls on its remaining chunks
+            for future in pending:
+                future.cancel()
+            raise
 
-    # 2. Extract Structure
-    decisions = extract_decisions_using_llm(text, filename)
+    logger.info(f"Extracted {len(decisions)} decisions from {filename} using Groq ({chunk_count} chunk(s))")
+    return merge_decisions(decisions) if chunk_count > 1 else decisions
 
+def extract_decisions_using_llm(text: str, filename: str) -> List[DecisionNode]:
+    """
+    Uses Groq (Llama 3) to parse the raw text and extract structured decision data.
+    Long documents are split into overlapping chunks which are extracted
+    concurrently and then merged.
+    """
+    chunks = chunk_pages([(None, text)], settings.LLM_CHUNK_TOKENS, settings.LLM_CHUNK_OVERLAP_TOKENS)
+    return extract_decisions_from_chunks(chunks, filename)
+
+def extract_decisions_from_file(file_path: str, filename: str, pool: Optional[Executor] = None,
+                                stage_timings: Optional[dict] = None) -> List[DecisionNode]:
+    """
+    Streams a document page by page into the chunker and the LLM, so the
+    full text is never held in memory. Decisions cite the pages of the
+    chunk they were found in. PDF page ranges are extracted by pool (or a
+    private process pool for large PDFs).
+    """
+    timings = stage_timings if stage_timings is not None else {}
+    text_seconds_before = timings.get("extract_text", 0.0)
+    start = time.perf_counter()
+
+    pages = _timed_iter(timings, "extract_text", iter_document_pages(file_path, pool))
+    chunks = chunk_pages(pages, settings.LLM_CHUNK_TOKENS, settings.LLM_CHUNK_OVERLAP_TOKENS)
+    decisions = extract_decisions_from_chunks(chunks, filename)
+
+    # Text extraction is interleaved with the LLM calls, count it only once
+    text_seconds = timings.get("extract_text", 0.0) - text_seconds_before
+    llm_seconds = time.perf_counter() - start - text_seconds
+    timings["llm_extract"] = round(timings.get("llm_extract", 0.0) + llm_seconds, 4)
+    return decisions
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """
+    Embeds many texts in one batched forward pass.
+    Returns a float32 array of shape (len(texts), 384).
+    """
+    start = time.perf_counter()
+    vectors = embedder.encode(texts, batch_size)
+    elapsed = time.perf_counter() - start
+    if texts:
+        logger.info(f"Embedded {len(texts)} texts in {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):.1f} texts/sec)")
+    return vectors
+
+def build_vector_text(decision: DecisionNode) -> str:
+    # Flatten list for embedding
+    rationale_text = " ".join(decision.rationale)
+    return f"{decision.decision_title}: {rationale_text}"
+
+def build_payload(decision: DecisionNode, content_hash: Optional[str] = None,
+                  decision_id: Optional[str] = None) -> dict:
+    payload = decision.model_dump()
+    # Indexed, range-filterable copy of decision_date
+    payload["decision_day"] = decision_day(decision.decision_date)
+    # Hash of the source file version this decision was extracted from
+    payload["content_hash"] = content_hash
+    # Documents (and versions) of the decision, more than one once near-duplicates are merged
+    payload["source_files"] = decision.source_files or [decision.source_file]
+    payload["source_versions"] = [source_version(decision.source_file, content_hash)] if content_hash else []
+    # Near-duplicates share a key, search can collapse them (group_by_decision)
+    payload["decision_key"] = decision_id
+    return payload
+
+def point_id(decision: DecisionNode) -> str:
+    """
+    Deterministic point id from the source file and the decision content,
+    so re-ingesting the same decision overwrites it instead of duplicating it.
+    """
+    content = json.dumps(decision.model_dump(exclude={"source_file", "source_pages", "source_files"}), sort_keys=True)
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{decision.source_file}:{digest}"))
+
+def _timed_iter(stage_timings: dict, stage: str, iterable: Iterable) -> Iterator:
+    """
+    Passes items through, adding the time spent producing them to stage_timings.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            stage_timings[stage] = round(stage_timings.get(stage, 0.0) + elapsed, 4)
+        yield item
+
+@contextmanager
+def _timed(stage_timings: Optional[dict], stage: str):
+    """
+    Adds the wall-clock seconds spent in a stage to stage_timings.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stage_timings is not None:
+            elapsed = time.perf_counter() - start
+            stage_timings[stage] = round(stage_timings.get(stage, 0.0) + elapsed, 4)
+
+def store_decisions(decisions: List[DecisionNode], source_hashes: Optional[Dict[str, str]] = None,
+                    stage_timings: Optional[dict] = None) -> List[str]:
+    """
+    Embeds a batch of decisions (possibly from many files) in one pass
+    and upserts them. With DEDUP_ENABLED, near-duplicates of stored
+    decisions are merged into them instead. Returns the point id each
+    decision ended up in, in the order of decisions.
+    """
     if not decisions:
-        logger.warning(f"No decisions found in {filename}")
-        return
+        return []
+    source_hashes = source_hashes or {}
 
-    points = []
-    for decision in decisions:
-        # 3. Create Vector content (Flatten list for embedding)
-        rationale_text = " ".join(decision.rationale)
-        vector_content = f"{decision.decision_title}: {rationale_text}"
-        embedding = embed_text(vector_content)
-        
-        # 4. Prepare Payload
-        payload = decision.model_dump()
-        
-        # 5. Create Point
-        point_id = str(uuid.uuid4())
-        points.append(
-            models.PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload=payload
-            )
-        )
-
-    # 6. Upload
-    db_client.upsert_points(points)
-    logger.info(f"Successfully ingested {len(points)} decisions from {filename}")
+    # 3. Create Vector content (per-field texts are embedded in the same pass)
+    texts = [build_vector_text(d) for d in decisions]
+    field_texts = [build_field_texts(d) for d in decisions] if settings.FIELD_VECTORS_ENABLED else []
+    with _timed(stage_timings, "embed"):
+        all_vectors = embed_texts(texts + flatten_field_texts(field_texts))
+    vectors = all_vectors[:len(texts)]
+
+    # 4. Prepare Payloads and Point ids
+    ids = [point_id(decision) for decision in decisions]
+    payloads = [
+        build_payload(decision, source_hashes.get(decision.source_file), decision_id)
+        for decision, decision_id in zip(decisions, ids)
+    ]
+    field_vectors = group_field_vectors(field_texts, all_vectors[len(texts):]) if field_texts else []
+
+    # 4a. Merge near-duplicates of stored decisions (and of each other)
+    final_ids, source_updates = ids, {}
+    if settings.DEDUP_ENABLED:
+        with _timed(stage_timings, "consolidate"):
+            keep, final_ids, source_updates = consolidate_batch(ids, vectors, payloads)
+        ids = [ids[i] for i in keep]
+        vectors = vectors[keep]
+        payloads = [payloads[i] for i in keep]
+        field_vectors = [field_vectors[i] for i in keep] if field_vectors else []
+
+    # 4b. Lexical vectors for hybrid search
+    with _timed(stage_timings, "sparse_encode"):
+        sparse_vectors = encode_documents([document_text(p) for p in payloads])
+
+    # 5. Upload
+    with _timed(stage_timings, "upsert"):
+        if ids:
+            db_client.upload_vectors(ids, vectors, payloads, sparse_vectors)
+        if field_vectors:
+            db_client.upload_field_vectors(ids, field_vectors, payloads)
+        db_client.set_payloads(source_updates)
+    return final_ids
+
+def index_decisions(decisions: List[DecisionNode], source_hashes: Dict[str, str],
+                    stage_timings: Optional[dict] = None) -> List[str]:
+    """
+    Stores the decisions of one or more files and removes the decisions
+    that are no longer in the new version of each file.
+    """
+    ids = store_decisions(decisions, source_hashes, stage_timings)
+
+    # 6. Remove stale decisions (files whose new version has none lose them all)
+    ids_by_file = defaultdict(list, {filename: [] for filename in source_hashes})
+    for decision, decision_id in zip(decisions, ids):
+        ids_by_file[decision.source_file].append(decision_id)
+    with _timed(stage_timings, "cleanup"):
+        for filename, keep_ids in ids_by_file.items():
+            db_client.delete_stale_points(filename, keep_ids)
+
+    # 7. Only now is the version complete, so later ingestions may skip it
+    for filename, content_hash in source_hashes.items():
+        catalog.record(filename, indexed_hash=content_hash)
+    return ids
+
+def indexed_version_count(filename: str, content_hash: str) -> Optional[int]:
+    """
+    Number of decisions stored for this exact version of a file (0 for a
+    version without decisions), or None if its ingestion never finished
+    (so it has to run again).
+    """
+    if catalog.indexed_hash(filename) != content_hash:
+        return None
+    return db_client.count_source_version(filename, content_hash)
+
+def ingest_files(file_paths: List[str], stage_timings: Optional[dict] = None) -> Dict[str, int]:
+    """
+    Ingests several files, sharing a single embedding pass and upsert.
+    Files whose content is already indexed are skipped, and decisions that
+    disappeared from a changed file are removed.
+    Returns the number of decisions indexed per filename.
+    """
+    counts = {}
+    source_hashes = {}
+    all_decisions = []
+    for file_path in file_paths:
+        filename = file_path.split("/")[-1]
+
+        # 0. Skip files whose exact content is already indexed
+        content_hash = file_hash(file_path)
+        catalog.record(filename, content_hash=content_hash, size=os.path.getsize(file_path))
+        existing = indexed_version_count(filename, content_hash)
+        if existing is not None:
+            logger.info(f"Skipping {filename}: unchanged since last ingestion ({existing} decisions)")
+            counts[filename] = existing
+            continue
+
+        # 1-2. Stream the text into the LLM extraction
+        decisions = extract_decisions_from_file(file_path, filename, stage_timings=stage_timings)
+
+        if not decisions:
+            logger.warning(f"No decisions found in {filename}")
+        counts[filename] = len(decisions)
+        source_hashes[filename] = content_hash
+        all_decisions.extend(decisions)
+
+    index_decisions(all_decisions, source_hashes, stage_timings)
+
+    for filename, count in counts.items():
+        if count and filename in source_hashes:
+            logger.info(f"Successfully ingested {count} decisions from {filename}")
+    return counts
+
+def ingest_file(file_path: str, stage_timings: Optional[dict] = None) -> int:
+    """
+    Extracts, embeds and stores the decisions in a file.
+    Returns the number of decisions indexed for it. If stage_timings is given,
+    it is filled with the seconds spent in each stage.
+    """
+    return sum(ingest_files([file_path], stage_timings).values())
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from backend.catalog import catalog
+from backend.config import settings
+from backend.metrics import registry, ingest_documents, ingest_decisions, ingest_stage_seconds
+from backend.models import IngestJob
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when too many ingestion jobs are already queued or running."""
+
+
+class IngestionQueue:
+    """
+    Runs ingest_file on a bounded pool of worker threads so uploads never
+    block the API event loop. Keeps an in-memory table of recent jobs.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, max_history: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="ingest"
+            )
+        return self._executor
+
+    def submit(self, file_path: str, filename: str) -> IngestJob:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Ingestion queue is full ({self._pending} jobs pending)")
+            job = IngestJob(
+                job_id=uuid.uuid4().hex,
+                filename=filename,
+                submitted_at=time.time()
+            )
+            self._jobs[job.job_id] = job
+            self._pending += 1
+            self._prune()
+            snapshot = job.model_copy()
+            executor = self._get_executor()
+
+        executor.submit(self._run, job, file_path)
+        return snapshot
+
+    def _run(self, job: IngestJob, file_path: str):
+        # Imported here so that importing the queue does not load the models
+        from backend.ingestion import ingest_file
+
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        catalog.record(job.filename, status="running", error=None)
+
+        timings = {}
+        try:
+            count = ingest_file(file_path, stage_timings=timings)
+            with self._lock:
+                job.status = "done"
+                job.decision_count = count
+            ingest_decisions.inc(count)
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.job_id} ({job.filename}) failed")
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+        finally:
+            ingest_documents.inc(status=job.status)
+            for stage, seconds in timings.items():
+                ingest_stage_seconds.observe(seconds, stage=stage)
+            with self._lock:
+                job.stage_timings = timings
+                job.finished_at = time.time()
+                self._pending -= 1
+            catalog.record(job.filename, status=job.status, decision_count=job.decision_count,
+                           stage_timings=timings, error=job.error)
+
+    @property
+    def pending(self) -> int:
+        """
+        Jobs queued or running.
+        """
+        return self._pending
+
+    def _prune(self):
+        # Drop the oldest finished jobs once the history limit is reached
+        if len(self._jobs) <= self.max_history:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_history:
+                break
+            if self._jobs[job_id].status in ("done", "failed"):
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def list_jobs(self) -> List[IngestJob]:
+        with self._lock:
+            jobs = [job.model_copy(deep=True) for job in self._jobs.values()]
+        # Newest first
+        jobs.reverse()
+        return jobs
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+
+# Global instance
+ingest_queue = IngestionQueue(
+    max_workers=settings.INGEST_WORKERS,
+    max_pending=settings.INGEST_MAX_PENDING,
+    max_history=settings.INGEST_JOB_HISTORY
+)
+
+registry.gauge("precedent_ingest_jobs_pending", "Ingestion jobs queued or running", lambda: ingest_queue.pending)
@@ -1,24 +1,67 @@
+import gc
+import json
 import shutil
 import os
-from datetime import datetime
+import time
+from typing import Iterator, Literal, Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import TypeAdapter
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from backend.qdrant_client_wrapper import db_client
-from backend.ingestion import ingest_file
-from backend.retrieval import search_decisions
-from backend.models import SearchQuery, SearchResult
+from backend.jobs import ingest_queue, QueueFullError
+from backend.catalog import catalog, SORT_COLUMNS, encode_page_cursor, decode_page_cursor
+from backend.documents import shutdown_pdf_pool
+from backend.embeddings import embedder
+from backend.reranking import reranker
+from backend.config import settings
+from backend.metrics import registry, http_request_seconds, start_request_timings, server_timing_header
+from backend.retrieval import (search_decisions, search_decisions_batch, stream_search, next_cursor,
+                               encode_cursor, resolve_offset, query_cache)
+from backend.models import SearchQuery, SearchResult, SearchBatchResult, IngestJob, UploadedDocument
+from backend.response_cache import search_cache
+
+def preload_models():
+    """
+    Loads the models before the server forks its workers (gunicorn --preload),
+    so their weights are shared copy-on-write. Nothing is encoded here:
+    torch thread pools started before a fork can hang in the workers.
+    """
+    embedder.model
+    if settings.RERANK_ENABLED:
+        reranker.model
+    # Keep the garbage collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+def warm_up():
+    """
+    One encode and one Qdrant search, so the first request is as fast as the rest.
+    """
+    db_client.warm(embedder.warm().tolist())
+    if settings.RERANK_ENABLED:
+        reranker.warm()
+
+if settings.PRELOAD_MODELS:
+    preload_models()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Ensure DB exists
-    db_client.ensure_collection_exists()
+    # Startup: connect (once per worker) and ensure DB exists
+    await run_in_threadpool(db_client.connect)
+    await run_in_threadpool(db_client.ensure_collection_exists)
+    # First start with the catalog: list the documents uploaded before it
+    if await run_in_threadpool(catalog.count) == 0:
+        await run_in_threadpool(catalog.import_directory, STORED_DOCS_DIR)
+    if settings.EMBEDDING_WARMUP:
+        await run_in_threadpool(warm_up)
     yield
-    # Shutdown logic if needed
-
-from fastapi.staticfiles import StaticFiles
-
-# ... existing code ...
+    # Shutdown: let running ingestion jobs finish
+    ingest_queue.shutdown(wait=True)
+    shutdown_pdf_pool()
+    db_client.close()
 
 app = FastAPI(title="Precedent API", lifespan=lifespan)
 
@@ -29,8 +72,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template, not raw path, to keep the series bounded
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        elapsed,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    if settings.METRICS_TIMING_HEADERS:
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 # Mount static files for document access
 STORED_DOCS_DIR = "stored_docs"
 os.makedirs(STORED_DOCS_DIR, exist_ok=True)
@@ -43,61 +107,179 @@ os.makedirs(TEMP_DIR, exist_ok=True)
 def read_root():
     return {"status": "Precedent System Online"}
 
-@app.get("/uploads/")
-def list_uploads():
+@app.get("/uploads/", response_model=list[UploadedDocument])
+def list_uploads(response: Response,
+                 limit: int = Query(100, ge=1, le=1000),
+                 cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+                 sort: Literal[SORT_COLUMNS] = "uploaded_at",
+                 order: Literal["asc", "desc"] = "desc"):
     """
-    List all uploaded files with metadata.
+    List ingested documents with their ingestion status and decision count,
+    newest first by default. Pages come from the catalog's indexes; the
+    X-Next-Cursor header holds the cursor for the next page and
+    X-Total-Count the number of documents.
     """
-    files = []
-    if os.path.exists(STORED_DOCS_DIR):
-        for filename in os.listdir(STORED_DOCS_DIR):
-            if filename.startswith("."): continue # Skip hidden files
-            
-            filepath = os.path.join(STORED_DOCS_DIR, filename)
-            stats = os.stat(filepath)
-            
-            files.append({
-                "filename": filename,
-                "upload_time": datetime.fromtimestamp(stats.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                "uploaded_by": "Admin" # Placeholder for now
-            })
-            
-    # Sort by newest first
-    files.sort(key=lambda x: x['upload_time'], reverse=True)
-    return files
+    descending = order == "desc"
+    try:
+        after = decode_page_cursor(cursor, sort, descending) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    documents, last = catalog.list_documents(limit=limit, after=after, sort=sort, descending=descending)
+    response.headers["X-Total-Count"] = str(catalog.count())
+    if len(documents) == limit:
+        response.headers["X-Next-Cursor"] = encode_page_cursor(sort, descending, last)
+    return documents
 
-@app.post("/ingest/")
+def _save_upload(file: UploadFile, file_location: str):
+    with open(file_location, "wb+") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+@app.post("/ingest/", response_model=IngestJob, status_code=202)
 async def upload_file(file: UploadFile = File(...)):
     """
     Upload a PDF or Text file to extract decisions from.
+    The file is queued for background ingestion; poll /ingest/{job_id} for progress.
     """
     try:
         # Save to stored_docs for persistent access
         file_location = f"{STORED_DOCS_DIR}/{file.filename}"
-        with open(file_location, "wb+") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_threadpool(_save_upload, file, file_location)
+        # Blocking SQLite write (ingest workers may hold the catalog lock), keep it off the event loop
+        await run_in_threadpool(catalog.record, file.filename, size=os.path.getsize(file_location),
+                                uploaded_at=time.time(), status="queued", decision_count=None,
+                                stage_timings=None, error=None)
             
-        # Trigger ingestion
-        ingest_file(file_location)
-        
-        # Do NOT delete the file
-        
-        return {"message": f"Successfully processed {file.filename}"}
+        # Queue ingestion (Do NOT delete the file)
+        return ingest_queue.submit(file_location, file.filename)
+    except QueueFullError as e:
+        await run_in_threadpool(catalog.record, file.filename, status="failed", error=str(e))
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ingest/jobs", response_model=list[IngestJob])
+def list_ingest_jobs():
+    """
+    List recent ingestion jobs, newest first.
+    """
+    return ingest_queue.list_jobs()
+
+@app.get("/ingest/{job_id}", response_model=IngestJob)
+def get_ingest_job(job_id: str):
+    """
+    Get the status and stage timings of an ingestion job.
+    """
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+# Serializes a result page in one pass, without re-validating it
+search_results_adapter = TypeAdapter(list[SearchResult])
+
 @app.post("/search/", response_model=list[SearchResult])
 def search_memory(query: SearchQuery):
     """
     Search for past decisions.
+    When the page is full, the X-Next-Cursor header holds the cursor for the next page.
+    Identical searches are served from the response cache until the collection changes.
     """
     try:
-        return search_decisions(query)
+        cache_key = search_cache.key(query, resolve_offset(query))
+        cached = search_cache.get(cache_key)
+        if cached is None:
+            results = search_decisions(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+    if cached is not None:
+        body, cursor = cached
+    else:
+        body = search_results_adapter.dump_json(results)
+        cursor = next_cursor(query, results)
+        rerank = query.rerank if query.rerank is not None else settings.RERANK_ENABLED
+        # A re-ranking that ran out of time is not the answer to cache
+        if not (rerank and any(result.rerank_score is None for result in results)):
+            search_cache.put(cache_key, body, cursor)
+    headers = {"X-Next-Cursor": cursor} if cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.post("/search/batch", response_model=list[SearchBatchResult])
+def search_memory_batch(queries: list[SearchQuery]):
+    """
+    Run several searches in one request. All queries are embedded together
+    and sent to Qdrant in a single batch; results come back in request order.
+    """
+    if len(queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    try:
+        batch = search_decisions_batch(queries)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    return [
+        SearchBatchResult(results=results, next_cursor=next_cursor(query, results))
+        for query, results in zip(queries, batch)
+    ]
+
+def _sse_events(query: SearchQuery, results: Iterator[dict]) -> Iterator[str]:
+    count = 0
+    try:
+        for result in results:
+            count += 1
+            yield f"event: result\ndata: {json.dumps(result)}\n\n"
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        yield f"event: error\ndata: {json.dumps({'detail': f'Search failed: {e}'})}\n\n"
+        return
+    cursor = encode_cursor(resolve_offset(query) + query.limit) if count == query.limit else None
+    yield f"event: end\ndata: {json.dumps({'count': count, 'next_cursor': cursor})}\n\n"
+
+@app.post("/search/stream")
+def search_memory_stream(query: SearchQuery, request: Request,
+                         stream_format: Optional[Literal["ndjson", "sse"]] = Query(None, alias="format")):
+    """
+    Search, sending each result as soon as it is retrieved, as NDJSON (one
+    SearchResult per line) or server-sent events (format=sse, or
+    Accept: text/event-stream) ending with an "end" event holding next_cursor.
+    Results are serialized from the Qdrant payload without re-validation.
+    """
+    try:
+        results = stream_search(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream_format is None:
+        stream_format = "sse" if "text/event-stream" in request.headers.get("accept", "") else "ndjson"
+    if stream_format == "sse":
+        return StreamingResponse(_sse_events(query, results), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    return StreamingResponse((json.dumps(result) + "\n" for result in results), media_type="application/x-ndjson")
+
+@app.get("/search/stats")
+def search_stats():
+    """
+    Response cache, query embedding cache and re-ranker statistics, for
+    sizing SEARCH_CACHE_MAX_MB, QUERY_CACHE_SIZE and RERANK_TIME_BUDGET_MS.
+    """
+    return {"response_cache": search_cache.stats(), "query_cache": query_cache.stats(), "reranker": reranker.stats()}
+
+@app.get("/metrics")
+def metrics():
+    """
+    Counters and latency histograms in the Prometheus text format.
+    """
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
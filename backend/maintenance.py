@@ -0,0 +1,176 @@
+import argparse
+import logging
+from collections import defaultdict
+
+from qdrant_client.http import models
+
+from backend.consolidation import consolidate_collection
+from backend.embeddings import embedder
+from backend.field_vectors import build_field_texts, flatten_field_texts, group_field_vectors
+from backend.models import DecisionNode, decision_day
+from backend.qdrant_client_wrapper import db_client
+from backend.response_cache import search_cache
+from backend.sparse import SPARSE_VECTOR_NAME, encode_document, document_text
+
+
+def backfill_decision_days(batch_size: int = 512) -> int:
+    """
+    Adds the indexed decision_day field to points ingested before it existed.
+    Returns the number of points updated.
+    """
+    missing = models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key="decision_day"))])
+    updated = 0
+    offset = None
+    while True:
+        points, offset = db_client.client.scroll(
+            collection_name=db_client.collection_name,
+            scroll_filter=missing,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["decision_date"],
+            with_vectors=False
+        )
+        # One set_payload call per distinct day instead of one per point
+        by_day = defaultdict(list)
+        for point in points:
+            day = decision_day(point.payload.get("decision_date"))
+            if day is not None:
+                by_day[day].append(point.id)
+        for day, ids in by_day.items():
+            db_client.client.set_payload(
+                collection_name=db_client.collection_name,
+                payload={"decision_day": day},
+                points=ids
+            )
+            updated += len(ids)
+        if offset is None:
+            break
+    return updated
+
+
+def _copy_points(source: str, target: str, with_sparse: bool, batch_size: int = 256) -> int:
+    """
+    Copies every point from source to target, reusing the stored dense
+    vectors. With with_sparse, lexical vectors are recomputed from the payload.
+    """
+    copied = 0
+    offset = None
+    while True:
+        points, offset = db_client.client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        batch = []
+        for point in points:
+            dense = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            vector = dense
+            if with_sparse:
+                vector = {"": dense, SPARSE_VECTOR_NAME: encode_document(document_text(point.payload))}
+            batch.append(models.PointStruct(id=point.id, vector=vector, payload=point.payload))
+        if batch:
+            db_client.client.upsert(collection_name=target, points=batch)
+            copied += len(batch)
+        if offset is None:
+            break
+    return copied
+
+
+def build_field_index(batch_size: int = 128) -> int:
+    """
+    Embeds the per-field vectors of every stored decision into the fields
+    collection, for decisions ingested before FIELD_VECTORS_ENABLED was set.
+    Returns the number of decisions indexed.
+    """
+    db_client.ensure_fields_collection_exists()
+    indexed = 0
+    offset = None
+    while True:
+        points, offset = db_client.client.scroll(
+            collection_name=db_client.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        if points:
+            field_texts = [build_field_texts(DecisionNode.model_validate(point.payload)) for point in points]
+            vectors = embedder.encode(flatten_field_texts(field_texts))
+            db_client.upload_field_vectors([point.id for point in points], group_field_vectors(field_texts, vectors),
+                                           [point.payload for point in points])
+            indexed += len(points)
+            print(f"Indexed fields of {indexed} decisions...")
+        if offset is None:
+            break
+    return indexed
+
+
+def rebuild_collection() -> int:
+    """
+    Recreates the collection with the current configuration (e.g. adding
+    sparse vectors for hybrid search) without re-running the LLM or the
+    embedding model. Points are parked in a temporary collection meanwhile.
+    """
+    name = db_client.collection_name
+    staging = f"{name}__rebuild"
+    params = db_client.client.get_collection(name).config.params
+
+    if db_client.client.collection_exists(staging):
+        db_client.client.delete_collection(staging)
+    db_client.client.create_collection(collection_name=staging, vectors_config=params.vectors)
+    print(f"Copying points to {staging}...")
+    _copy_points(name, staging, with_sparse=False)
+
+    print(f"Recreating {name}...")
+    db_client.client.delete_collection(name)
+    db_client.ensure_collection_exists()
+    copied = _copy_points(staging, name, with_sparse=db_client.has_sparse_vectors)
+    db_client.client.delete_collection(staging)
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance tasks for the Qdrant memory index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create-indexes", help="Create missing payload indexes")
+    sub.add_parser("backfill-dates", help="Add decision_day to points ingested before it existed")
+    sub.add_parser("rebuild", help="Recreate the collection with the current config (adds sparse vectors)")
+    sub.add_parser("apply-storage-config",
+                   help="Apply QDRANT_QUANTIZATION, on-disk storage and HNSW settings to the existing collection")
+    sub.add_parser("build-field-index", help="Embed title, rationale, alternatives and outcome of stored decisions")
+    sub.add_parser("consolidate",
+                   help="Merge near-duplicate decisions ingested before DEDUP_ENABLED and group similar ones")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "create-indexes":
+        db_client.ensure_collection_exists()
+    elif args.command == "backfill-dates":
+        db_client.ensure_collection_exists()
+        print(f"Updated {backfill_decision_days()} points")
+    elif args.command == "rebuild":
+        print(f"Rebuilt collection with {rebuild_collection()} points")
+    elif args.command == "apply-storage-config":
+        db_client.apply_storage_config()
+        info = db_client.client.get_collection(db_client.collection_name)
+        print(f"Status: {info.status}, re-indexing continues in the background")
+        print(f"Vectors: {info.config.params.vectors}")
+        print(f"HNSW: {info.config.hnsw_config}")
+        print(f"Quantization: {info.config.quantization_config}")
+    elif args.command == "build-field-index":
+        db_client.ensure_collection_exists()
+        print(f"Indexed fields of {build_field_index()} decisions")
+    elif args.command == "consolidate":
+        db_client.ensure_collection_exists()
+        merged, grouped = consolidate_collection()
+        print(f"Merged {merged} near-duplicate points, grouped {grouped} similar ones")
+
+    # These commands write to Qdrant directly, so cached search responses are stale
+    if args.command in ("backfill-dates", "rebuild", "build-field-index"):
+        search_cache.bump_version()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Minimal in-process metrics in the Prometheus text format, served at /metrics.
+
+Counters and histograms are plain dicts behind a lock, so recording a value
+costs a dict lookup and an addition. Stage timings are also collected per
+request (see start_request_timings) for the optional Server-Timing header.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Seconds, from a cached search up to a long LLM extraction
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Stage -> seconds for the request being served, None outside a request
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, timing_name: Optional[str] = None, **labels):
+        """
+        Observes the duration of the block. With timing_name, the duration
+        is also added to the current request's timings.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(elapsed, **labels)
+            if timing_name:
+                record_timing(timing_name, elapsed)
+
+    def render(self) -> list:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = self.header()
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Gauge read from a callback at scrape time, returning a number or a
+    dict of label tuple -> number.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> list:
+        value = self.callback()
+        values = value if isinstance(value, dict) else {(): value}
+        lines = self.header()
+        for key, number in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {number}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Starts collecting stage timings for the current request (context).
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_timing(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+# Global instance
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "precedent_http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+
+ingest_stage_seconds = registry.histogram(
+    "precedent_ingest_stage_seconds", "Seconds per document spent in each ingestion stage", ["stage"])
+ingest_documents = registry.counter(
+    "precedent_ingest_documents_total", "Ingested documents by outcome", ["status"])
+ingest_decisions = registry.counter(
+    "precedent_ingest_decisions_total", "Decisions extracted and indexed")
+
+search_stage_seconds = registry.histogram(
+    "precedent_search_stage_seconds", "Seconds per search request spent in each stage", ["stage"])
+search_queries = registry.counter(
+    "precedent_search_queries_total", "Search queries by mode", ["mode", "rerank"])
+search_cache_lookups = registry.counter(
+    "precedent_search_cache_lookups_total", "Search response cache lookups", ["result"])
+
+llm_request_seconds = registry.histogram(
+    "precedent_llm_request_seconds", "Groq chat completion latency, including failed attempts")
+llm_retries = registry.counter(
+    "precedent_llm_retries_total", "Groq calls retried after a transient error", ["error"])
+llm_tokens = registry.counter(
+    "precedent_llm_tokens_total", "Groq token usage", ["kind"])
+extraction_cache_lookups = registry.counter(
+    "precedent_extraction_cache_lookups_total", "Extraction cache lookups", ["result"])
+
+qdrant_request_seconds = registry.histogram(
+    "precedent_qdrant_request_seconds", "Qdrant call latency", ["operation"])
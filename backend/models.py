@@ -1,5 +1,22 @@
+import re
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
+
+def decision_day(date: Optional[str]) -> Optional[int]:
+    """
+    Converts a loose "YYYY-MM-DD" / "YYYY-MM" / "YYYY" date into a sortable
+    YYYYMMDD integer, which is what we index and range-filter on in Qdrant.
+    Missing month or day default to 01. Returns None if no year is found.
+    """
+    if not date:
+        return None
+    match = re.search(r"(\d{4})(?:[-/.](\d{1,2}))?(?:[-/.](\d{1,2}))?", date)
+    if not match:
+        return None
+    year = int(match.group(1))
+    month = min(max(int(match.group(2) or 1), 1), 12)
+    day = min(max(int(match.group(3) or 1), 1), 31)
+    return year * 10000 + month * 100 + day
 
 class DecisionNode(BaseModel):
     """
@@ -13,6 +30,8 @@ class DecisionNode(BaseModel):
     outcome: Optional[str] = Field(None, description="Known outcome if this is a past decision")
     tags: List[str] = Field(default_factory=list, description="Keywords for filtering")
     source_file: str = Field(..., description="Name of the source document")
+    source_pages: List[int] = Field(default_factory=list, description="Pages of the source document (PDFs only)")
+    source_files: List[str] = Field(default_factory=list, description="Every document this decision was found in, when near-duplicates were merged")
 
     @field_validator('rationale', mode='before')
     @classmethod
@@ -25,9 +44,69 @@ class SearchQuery(BaseModel):
     query: str
     filter_team: Optional[str] = None
     filter_year: Optional[int] = None
-    limit: int = 5
+    limit: int = Field(5, ge=1, le=1000, description="Results per page")
+    filter_teams: Optional[List[str]] = Field(None, description="Match decisions from any of these teams")
+    filter_year_from: Optional[int] = Field(None, description="Inclusive start year")
+    filter_year_to: Optional[int] = Field(None, description="Inclusive end year")
+    filter_date_from: Optional[str] = Field(None, description="Inclusive start date (YYYY-MM-DD)")
+    filter_date_to: Optional[str] = Field(None, description="Inclusive end date (YYYY-MM-DD)")
+    filter_tags_any: Optional[List[str]] = Field(None, description="Match decisions with at least one of these tags")
+    filter_tags_all: Optional[List[str]] = Field(None, description="Match decisions with all of these tags")
+    filter_source_file: Optional[str] = None
+    mode: Literal["dense", "hybrid", "fields"] = Field("dense", description="hybrid adds lexical (BM25) matching for exact names and figures, fields searches title, rationale, alternatives and outcome separately")
+    fusion: Literal["rrf", "weighted"] = Field("rrf", description="How hybrid results are combined")
+    sparse_weight: float = Field(1.0, ge=0, description="Weight of lexical matches relative to semantic ones")
+    field_weights: Optional[Dict[Literal["title", "rationale", "alternatives", "outcome"], float]] = Field(
+        None, description="Field search weights (0 skips a field), defaults to FIELD_WEIGHTS")
+    score_threshold: Optional[float] = Field(None, description="Minimum cosine similarity, defaults to SEARCH_SCORE_THRESHOLD")
+    offset: int = Field(0, ge=0, description="Number of results to skip")
+    cursor: Optional[str] = Field(None, description="X-Next-Cursor value from the previous page, overrides offset")
+    payload_fields: Optional[List[str]] = Field(None, description="Only return these payload fields (in SearchResult.fields)")
+    hnsw_ef: Optional[int] = Field(None, ge=1, description="HNSW search breadth (recall vs latency), defaults to SEARCH_HNSW_EF")
+    exact: bool = Field(False, description="Exhaustive search without the HNSW index (slow, for evaluation)")
+    rerank: Optional[bool] = Field(None, description="Re-rank candidates with the cross-encoder, defaults to RERANK_ENABLED")
+    rerank_candidates: Optional[int] = Field(None, ge=1, le=500, description="Candidates to re-rank, defaults to RERANK_CANDIDATES")
+    group_by_decision: bool = Field(False, description="Return only the best hit of each group of near-duplicate decisions (same decision_key)")
 
 class SearchResult(BaseModel):
     score: float
-    decision: DecisionNode
-    context: str = Field(..., description="Relevant snippet from the source text")
+    decision: Optional[DecisionNode] = Field(None, description="Full decision, omitted when payload_fields is set")
+    context: str = Field("", description="Relevant snippet from the source text")
+    id: Optional[str] = None
+    fields: Optional[Dict[str, Any]] = Field(None, description="Selected payload fields when payload_fields is set")
+    rerank_score: Optional[float] = Field(None, description="Cross-encoder score, set when the results were re-ranked")
+
+class SearchBatchResult(BaseModel):
+    """
+    Results of one query of a /search/batch request.
+    """
+    results: List[SearchResult]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, set when this page is full")
+
+class UploadedDocument(BaseModel):
+    """
+    A document in the catalog, as listed by GET /uploads/.
+    """
+    filename: str
+    upload_time: str
+    uploaded_by: str
+    content_hash: Optional[str] = None
+    size: Optional[int] = Field(None, description="Bytes")
+    status: Optional[str] = Field(None, description="queued, running, done, failed, or imported (uploaded before the catalog existed)")
+    decision_count: Optional[int] = None
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each ingestion stage")
+    error: Optional[str] = None
+
+class IngestJob(BaseModel):
+    """
+    Status of a background ingestion job.
+    """
+    job_id: str
+    filename: str
+    status: str = Field("queued", description="queued, running, done or failed")
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    decision_count: Optional[int] = None
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each ingestion stage")
+    error: Optional[str] = None
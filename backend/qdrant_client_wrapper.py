@@ -1,22 +1,139 @@
+import logging
+import threading
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from backend.config import settings
+from backend.metrics import qdrant_request_seconds
+from backend.response_cache import search_cache
+from backend.sparse import SPARSE_VECTOR_NAME
+from backend.field_vectors import FIELD_VECTORS
+
+logger = logging.getLogger(__name__)
+
+# Payload fields we filter on, and how Qdrant should index them
+PAYLOAD_INDEXES = {
+    "team": models.PayloadSchemaType.KEYWORD,
+    "tags": models.PayloadSchemaType.KEYWORD,
+    "source_file": models.PayloadSchemaType.KEYWORD,
+    "content_hash": models.PayloadSchemaType.KEYWORD,
+    # Every document of a consolidated decision, and their "file:content_hash" versions
+    "source_files": models.PayloadSchemaType.KEYWORD,
+    "source_versions": models.PayloadSchemaType.KEYWORD,
+    # YYYYMMDD integer derived from decision_date, for year/date ranges
+    "decision_day": models.IntegerIndexParams(
+        type=models.IntegerIndexType.INTEGER,
+        lookup=False,
+        range=True
+    ),
+}
+
+def remove_source(payload: dict, source_file: str) -> dict:
+    """
+    Payload update dropping source_file from a consolidated decision. If it
+    was the primary source, the next one takes over (its pages are unknown).
+    """
+    files = [name for name in payload.get("source_files") or [] if name != source_file]
+    update = {
+        "source_files": files,
+        "source_versions": [
+            version for version in payload.get("source_versions") or []
+            if version.rsplit(":", 1)[0] != source_file
+        ],
+    }
+    if payload.get("source_file") == source_file and files:
+        update["source_file"] = files[0]
+        update["source_pages"] = []
+    return update
+
+
+# Size for all-MiniLM-L6-v2
+VECTOR_SIZE = 384
+
+def quantization_config():
+    """
+    Collection quantization from QDRANT_QUANTIZATION (none, scalar or binary).
+    Quantized vectors are kept in RAM while the originals can live on disk.
+    """
+    kind = settings.QDRANT_QUANTIZATION
+    if kind == "none":
+        return None
+    if kind == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        ))
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        ))
+    raise ValueError(f"Unknown QDRANT_QUANTIZATION: {kind} (expected none, scalar or binary)")
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
 
 class QdrantHandler:
+    """
+    Wrapper around the Qdrant collections. The client connects on first
+    use (or by connect()), so importing this module never opens the
+    database, and a server started with --preload connects in each worker.
+    """
+
     def __init__(self):
-        # If QDRANT_URL is set (from env), use it. e.g. "http://localhost:6333" for Docker
-        # If not set (None), use path based storage (Embedded)
-        if settings.QDRANT_URL:
-            print(f"Connecting to Qdrant at {settings.QDRANT_URL}")
-            self.client = QdrantClient(
-                url=settings.QDRANT_URL,
-                api_key=settings.QDRANT_API_KEY
-            )
-        else:
-            print(f"Using Embedded Qdrant at {settings.QDRANT_PATH}")
-            self.client = QdrantClient(path=settings.QDRANT_PATH)
-            
         self.collection_name = settings.COLLECTION_NAME
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._has_sparse = None
+
+    @property
+    def client(self) -> QdrantClient:
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    def connect(self):
+        with self._client_lock:
+            if self._client is not None:
+                return
+            # If QDRANT_URL is set (from env), use it. e.g. "http://localhost:6333" for Docker
+            # If not set (None), use path based storage (Embedded)
+            if settings.QDRANT_URL:
+                logger.info(f"Connecting to Qdrant at {settings.QDRANT_URL}")
+                self._client = QdrantClient(
+                    url=settings.QDRANT_URL,
+                    api_key=settings.QDRANT_API_KEY
+                )
+            else:
+                logger.info(f"Using Embedded Qdrant at {settings.QDRANT_PATH}")
+                self._client = QdrantClient(path=settings.QDRANT_PATH)
+
+    def close(self):
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+                self._has_sparse = None
+
+    def warm(self, vector: list[float]):
+        """
+        Runs one small search so the first request doesn't pay for
+        loading the collection (embedded mode) or opening the connection.
+        """
+        self.query_batch([self.dense_request(vector, limit=1, with_payload=False)])
+
+    @property
+    def has_sparse_vectors(self) -> bool:
+        """
+        Whether the collection stores sparse lexical vectors. Collections
+        created before hybrid search need `python -m backend.maintenance rebuild`.
+        """
+        if self._has_sparse is None:
+            params = self.client.get_collection(self.collection_name).config.params
+            self._has_sparse = SPARSE_VECTOR_NAME in (params.sparse_vectors or {})
+            if not self._has_sparse:
+                logger.warning(f"Collection {self.collection_name} has no sparse vectors, hybrid search falls back to dense")
+        return self._has_sparse
 
     def ensure_collection_exists(self):
         """
@@ -27,44 +144,333 @@ class QdrantHandler:
         exists = any(c.name == self.collection_name for c in collections.collections)
 
         if not exists:
-            print(f"Creating collection: {self.collection_name}")
+            logger.info(f"Creating collection: {self.collection_name}")
             self.client.create_collection(
                 collection_name=self.collection_name,
                 vectors_config=models.VectorParams(
-                    size=384,  # Size for all-MiniLM-L6-v2
-                    distance=models.Distance.COSINE
-                )
+                    size=VECTOR_SIZE,
+                    distance=models.Distance.COSINE,
+                    on_disk=settings.QDRANT_VECTORS_ON_DISK
+                ),
+                hnsw_config=hnsw_config(),
+                quantization_config=quantization_config(),
+                on_disk_payload=settings.QDRANT_PAYLOAD_ON_DISK,
+                # BM25-style lexical vectors, Qdrant applies the IDF
+                sparse_vectors_config={
+                    SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+                }
             )
         else:
-            print(f"Collection {self.collection_name} already exists.")
+            logger.info(f"Collection {self.collection_name} already exists.")
+        self._has_sparse = None
+
+        self.ensure_payload_indexes()
+        if settings.FIELD_VECTORS_ENABLED:
+            self.ensure_fields_collection_exists()
+
+    @property
+    def fields_collection_name(self) -> str:
+        # Companion collection with one named vector per decision field, same point ids
+        return f"{self.collection_name}_fields"
+
+    def ensure_fields_collection_exists(self):
+        """
+        Creates the per-field collection used by field-weighted search.
+        Multi-vector fields (rationale, alternatives) hold one vector per
+        paragraph and are matched on their best paragraph (MAX_SIM).
+        """
+        name = self.fields_collection_name
+        if not self.client.collection_exists(name):
+            logger.info(f"Creating collection: {name}")
+            vectors_config = {}
+            for field, multi in FIELD_VECTORS.items():
+                vectors_config[field] = models.VectorParams(
+                    size=VECTOR_SIZE,
+                    distance=models.Distance.COSINE,
+                    on_disk=settings.QDRANT_VECTORS_ON_DISK,
+                    multivector_config=models.MultiVectorConfig(
+                        comparator=models.MultiVectorComparator.MAX_SIM
+                    ) if multi else None
+                )
+            self.client.create_collection(
+                collection_name=name,
+                vectors_config=vectors_config,
+                hnsw_config=hnsw_config(),
+                quantization_config=quantization_config(),
+                on_disk_payload=settings.QDRANT_PAYLOAD_ON_DISK
+            )
+        self.ensure_payload_indexes(name)
 
-    def upsert_points(self, points: list[models.PointStruct]):
-        self.client.upsert(
+    def apply_storage_config(self):
+        """
+        Migrates an existing collection to the configured quantization,
+        on-disk storage and HNSW parameters in place. Qdrant re-indexes
+        in the background, searches keep working meanwhile.
+        """
+        logger.info(f"Updating storage config of {self.collection_name}")
+        self.client.update_collection(
             collection_name=self.collection_name,
-            points=points
+            vectors_config={"": models.VectorParamsDiff(on_disk=settings.QDRANT_VECTORS_ON_DISK)},
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config() or models.Disabled.DISABLED,
+            collection_params=models.CollectionParamsDiff(on_disk_payload=settings.QDRANT_PAYLOAD_ON_DISK)
         )
 
-    def search(self, vector: list[float], limit: int = 5, filter_conditions: dict = None):
-        query_filter = None
-        if filter_conditions:
-            must_conditions = []
-            for key, value in filter_conditions.items():
-                if value is not None:
-                    must_conditions.append(
-                        models.FieldCondition(
-                            key=key,
-                            match=models.MatchValue(value=value)
-                        )
+    def search_params(self, hnsw_ef: int = None, exact: bool = False,
+                      ignore_quantization: bool = False) -> models.SearchParams:
+        """
+        Search-time parameters. Quantized searches re-score an oversampled
+        candidate set with the original vectors (SEARCH_QUANTIZATION_*).
+        """
+        hnsw_ef = hnsw_ef or settings.SEARCH_HNSW_EF or None
+        quantization = None
+        if settings.QDRANT_QUANTIZATION != "none":
+            quantization = models.QuantizationSearchParams(
+                ignore=ignore_quantization,
+                rescore=settings.SEARCH_QUANTIZATION_RESCORE,
+                oversampling=settings.SEARCH_QUANTIZATION_OVERSAMPLING
+            )
+        if hnsw_ef is None and not exact and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, exact=exact, quantization=quantization)
+
+    def ensure_payload_indexes(self, collection_name: str = None):
+        """
+        Creates the payload indexes used by search filters, so filtered
+        searches don't have to scan payloads. Safe to call repeatedly.
+        """
+        collection_name = collection_name or self.collection_name
+        existing = self.client.get_collection(collection_name).payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            logger.info(f"Creating payload index on {field_name}")
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema
+            )
+
+    def upload_vectors(self, ids: list, vectors: np.ndarray, payloads: list[dict],
+                       sparse_vectors: list[models.SparseVector] = None):
+        """
+        Bulk upsert from a float32 array, without boxing each vector into
+        a Python list. Batched by QDRANT_UPSERT_BATCH_SIZE.
+        """
+        if sparse_vectors is not None and self.has_sparse_vectors:
+            vectors = [
+                {"": dense, SPARSE_VECTOR_NAME: sparse}
+                for dense, sparse in zip(vectors, sparse_vectors)
+            ]
+        try:
+            with qdrant_request_seconds.time(operation="upload"):
+                self.client.upload_collection(
+                    collection_name=self.collection_name,
+                    ids=ids,
+                    vectors=vectors,
+                    payload=payloads,
+                    batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+                    wait=True
+                )
+        finally:
+            search_cache.bump_version()
+
+    def upload_field_vectors(self, ids: list, field_vectors: list[dict], payloads: list[dict]):
+        """
+        Upserts the per-field vectors of decisions into the fields collection.
+        Only the filterable payload fields are copied there.
+        """
+        filter_payloads = [{key: payload.get(key) for key in PAYLOAD_INDEXES} for payload in payloads]
+        try:
+            with qdrant_request_seconds.time(operation="upload_fields"):
+                self.client.upload_collection(
+                    collection_name=self.fields_collection_name,
+                    ids=ids,
+                    vectors=field_vectors,
+                    payload=filter_payloads,
+                    batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+                    wait=True
+                )
+        finally:
+            search_cache.bump_version()
+
+    def count_source_version(self, source_file: str, content_hash: str) -> int:
+        """
+        Number of points extracted from this exact version of a file,
+        including decisions merged into another document's point.
+        """
+        with qdrant_request_seconds.time(operation="count"):
+            return self.client.count(
+                collection_name=self.collection_name,
+                count_filter=models.Filter(should=[
+                    models.Filter(must=[
+                        models.FieldCondition(key="source_file", match=models.MatchValue(value=source_file)),
+                        models.FieldCondition(key="content_hash", match=models.MatchValue(value=content_hash)),
+                    ]),
+                    models.FieldCondition(key="source_versions",
+                                          match=models.MatchValue(value=f"{source_file}:{content_hash}")),
+                ]),
+                exact=True
+            ).count
+
+    def set_payloads(self, payloads: dict):
+        """
+        Overwrites the given payload keys of several points (point id ->
+        keys) in one request per collection.
+        """
+        if not payloads:
+            return
+        operations = [
+            models.SetPayloadOperation(set_payload=models.SetPayload(payload=payload, points=[point_id]))
+            for point_id, payload in payloads.items()
+        ]
+        try:
+            with qdrant_request_seconds.time(operation="set_payload"):
+                self.client.batch_update_points(collection_name=self.collection_name, update_operations=operations)
+                if settings.FIELD_VECTORS_ENABLED:
+                    # The fields collection only has the filterable keys, and may not hold
+                    # the point at all (snapshot imports, before build-field-index): a
+                    # filter selects nothing there instead of failing like an id list
+                    field_operations = [
+                        models.SetPayloadOperation(set_payload=models.SetPayload(
+                            payload={key: value for key, value in payload.items() if key in PAYLOAD_INDEXES},
+                            filter=models.Filter(must=[models.HasIdCondition(has_id=[point_id])])))
+                        for point_id, payload in payloads.items()
+                        if any(key in PAYLOAD_INDEXES for key in payload)
+                    ]
+                    if field_operations:
+                        self.client.batch_update_points(collection_name=self.fields_collection_name,
+                                                        update_operations=field_operations)
+        finally:
+            search_cache.bump_version()
+
+    def delete_points(self, ids: list):
+        if not ids:
+            return
+        selector = models.PointIdsList(points=ids)
+        try:
+            with qdrant_request_seconds.time(operation="delete"):
+                self.client.delete(collection_name=self.collection_name, points_selector=selector)
+                if settings.FIELD_VECTORS_ENABLED:
+                    self.client.delete(collection_name=self.fields_collection_name, points_selector=selector)
+        finally:
+            search_cache.bump_version()
+
+    def delete_stale_points(self, source_file: str, keep_ids: list):
+        """
+        Removes source_file from every point not in keep_ids. Points of no
+        other document are deleted in one request; consolidated decisions
+        that other documents share only lose this one from their sources.
+        """
+        of_file = models.Filter(should=[
+            models.FieldCondition(key="source_file", match=models.MatchValue(value=source_file)),
+            models.FieldCondition(key="source_files", match=models.MatchValue(value=source_file)),
+        ])
+        shared = models.FieldCondition(key="source_files", values_count=models.ValuesCount(gte=2))
+        not_kept = models.HasIdCondition(has_id=keep_ids)
+        selector = models.FilterSelector(filter=models.Filter(must=[of_file], must_not=[not_kept, shared]))
+        try:
+            with qdrant_request_seconds.time(operation="delete"):
+                self.client.delete(collection_name=self.collection_name, points_selector=selector)
+                if settings.FIELD_VECTORS_ENABLED:
+                    self.client.delete(collection_name=self.fields_collection_name, points_selector=selector)
+
+            updates = {}
+            offset = None
+            while True:
+                with qdrant_request_seconds.time(operation="scroll"):
+                    points, offset = self.client.scroll(
+                        collection_name=self.collection_name,
+                        scroll_filter=models.Filter(must=[of_file, shared], must_not=[not_kept]),
+                        limit=256,
+                        offset=offset,
+                        with_payload=["source_file", "source_files", "source_versions", "source_pages"],
+                        with_vectors=False
                     )
-            if must_conditions:
-                query_filter = models.Filter(must=must_conditions)
+                for point in points:
+                    updates[point.id] = remove_source(point.payload, source_file)
+                if offset is None:
+                    break
+            self.set_payloads(updates)
+        finally:
+            search_cache.bump_version()
 
-        return self.client.query_points(
-            collection_name=self.collection_name,
-            query=vector,
+    def dense_request(self, vector: list[float], limit: int = 5, query_filter: models.Filter = None,
+                      score_threshold: float = None, offset: int = 0, with_payload=True,
+                      search_params: models.SearchParams = None) -> models.QueryRequest:
+        return models.QueryRequest(query=vector, limit=limit, offset=offset, filter=query_filter,
+                                   score_threshold=score_threshold, with_payload=with_payload,
+                                   params=search_params)
+
+    def sparse_request(self, sparse_vector: models.SparseVector, limit: int = 5, query_filter: models.Filter = None,
+                       with_payload=True) -> models.QueryRequest:
+        return models.QueryRequest(query=sparse_vector, using=SPARSE_VECTOR_NAME, limit=limit,
+                                   filter=query_filter, with_payload=with_payload)
+
+    def hybrid_request(self, vector: list[float], sparse_vector: models.SparseVector, limit: int = 5,
+                       query_filter: models.Filter = None, sparse_weight: float = 1.0,
+                       score_threshold: float = None, offset: int = 0, with_payload=True,
+                       search_params: models.SearchParams = None) -> models.QueryRequest:
+        """
+        Dense and sparse prefetches fused server side with weighted reciprocal
+        rank fusion. score_threshold applies to the dense (cosine) candidates
+        only, fused scores are rank based. Falls back to dense without sparse vectors.
+        """
+        if not self.has_sparse_vectors:
+            return self.dense_request(vector, limit=limit, query_filter=query_filter,
+                                      score_threshold=score_threshold, offset=offset, with_payload=with_payload,
+                                      search_params=search_params)
+
+        prefetch_limit = (offset + limit) * settings.HYBRID_PREFETCH_FACTOR
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(query=vector, limit=prefetch_limit, filter=query_filter,
+                                score_threshold=score_threshold, params=search_params),
+                models.Prefetch(query=sparse_vector, using=SPARSE_VECTOR_NAME, limit=prefetch_limit, filter=query_filter),
+            ],
+            query=models.RrfQuery(rrf=models.Rrf(weights=[1.0, sparse_weight])),
             limit=limit,
-            query_filter=query_filter
-        ).points
+            offset=offset,
+            with_payload=with_payload
+        )
+
+    def field_request(self, field: str, vector: list[float], limit: int = 5, query_filter: models.Filter = None,
+                      search_params: models.SearchParams = None) -> models.QueryRequest:
+        """
+        Search of one named field vector in the fields collection (ids only).
+        """
+        return models.QueryRequest(query=[vector] if FIELD_VECTORS[field] else vector, using=field,
+                                   limit=limit, filter=query_filter, with_payload=False, params=search_params)
+
+    def query_batch(self, requests: list[models.QueryRequest], collection_name: str = None) -> list[list]:
+        """
+        Runs several queries in a single round trip, returning one hit list per request.
+        """
+        if not requests:
+            return []
+        with qdrant_request_seconds.time(operation="query_batch"):
+            responses = self.client.query_batch_points(collection_name=collection_name or self.collection_name,
+                                                       requests=requests)
+        return [response.points for response in responses]
+
+    def retrieve_scored(self, scored_ids: list[tuple], with_payload=True) -> list[models.ScoredPoint]:
+        """
+        Fetches the payloads of (id, score) pairs from the main collection,
+        keeping their order and scores.
+        """
+        if not scored_ids:
+            return []
+        with qdrant_request_seconds.time(operation="retrieve"):
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[point_id for point_id, _ in scored_ids],
+                with_payload=with_payload
+            )
+        by_id = {record.id: record for record in records}
+        return [
+            models.ScoredPoint(id=point_id, version=0, score=score, payload=by_id[point_id].payload)
+            for point_id, score in scored_ids if point_id in by_id
+        ]
 
 # Global instance
 db_client = QdrantHandler()
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Payload fields the cross-encoder reads
+RERANK_FIELDS = ["decision_title", "rationale"]
+
+
+def passage_text(payload: dict) -> str:
+    """
+    Text a decision is re-ranked on: its title followed by its rationale.
+    """
+    rationale = payload.get("rationale") or []
+    if isinstance(rationale, list):
+        rationale = " ".join(rationale)
+    return f"{payload.get('decision_title', '')}. {rationale}"
+
+
+class CrossEncoderReranker:
+    """
+    Re-orders search candidates by scoring (query, passage) pairs with a
+    local cross-encoder. Scores are cached per (query, passage), and each
+    call has a time budget after which the caller keeps the original order.
+    The model is loaded on first use (or by warm()).
+    """
+
+    def __init__(self, model_name: str, max_cache_entries: int, device: Optional[str] = None):
+        self.model_name = model_name
+        self.device = device
+        self.max_cache_entries = max_cache_entries
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Scoring runs off the request thread so a slow batch can be abandoned
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.reranked = 0
+        self.timeouts = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        start = time.perf_counter()
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(self.model_name, device=self.device)
+        logger.info(f"Loaded re-ranking model {self.model_name} in {time.perf_counter() - start:.2f}s")
+        return model
+
+    def warm(self):
+        self._score_pairs([("warm up", "warm up")])
+
+    def _score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        scores = self.model.predict(pairs, batch_size=settings.RERANK_BATCH_SIZE, show_progress_bar=False)
+        return [float(score) for score in scores]
+
+    def _score_and_cache(self, keys: list, pairs: List[Tuple[str, str]]) -> Dict[tuple, float]:
+        scored = dict(zip(keys, self._score_pairs(pairs)))
+        with self._cache_lock:
+            for key, score in scored.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        return scored
+
+    def score(self, query: str, passages: List[str], timeout: Optional[float] = None) -> Optional[List[float]]:
+        """
+        Scores every passage against query in one batch, reusing cached
+        pair scores. Returns None if scoring didn't finish within timeout seconds.
+        """
+        query_key = re.sub(r"\s+", " ", query).strip()
+        keys = [(query_key, hashlib.sha1(passage.encode("utf-8")).hexdigest()) for passage in passages]
+
+        scores = {}
+        with self._cache_lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+            self.cache_hits += len(scores)
+            self.cache_misses += len(keys) - len(scores)
+
+        missing = {}
+        for key, passage in zip(keys, passages):
+            if key not in scores:
+                missing.setdefault(key, (query, passage))
+        if missing:
+            future = self._executor.submit(self._score_and_cache, list(missing), list(missing.values()))
+            try:
+                scores.update(future.result(timeout=timeout))
+            except FutureTimeoutError:
+                # Drop it if it never started, otherwise let it finish and fill the cache
+                future.cancel()
+                with self._cache_lock:
+                    self.timeouts += 1
+                return None
+        return [scores[key] for key in keys]
+
+    def rerank(self, query: str, hits: list, budget_ms: Optional[float] = None) -> List[Tuple[object, Optional[float]]]:
+        """
+        Re-orders Qdrant hits by cross-encoder score. Returns (hit, score)
+        pairs, in the original order with score None if the budget ran out.
+        """
+        if not hits:
+            return []
+        budget_ms = settings.RERANK_TIME_BUDGET_MS if budget_ms is None else budget_ms
+        scores = self.score(query, [passage_text(hit.payload or {}) for hit in hits],
+                            timeout=budget_ms / 1000 if budget_ms > 0 else None)
+        if scores is None:
+            logger.warning(f"Re-ranking exceeded {budget_ms}ms, keeping retrieval order")
+            return [(hit, None) for hit in hits]
+        with self._cache_lock:
+            self.reranked += 1
+        return sorted(zip(hits, scores), key=lambda pair: pair[1], reverse=True)
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "reranked": self.reranked,
+                "timeouts": self.timeouts,
+                "cache_entries": len(self._cache),
+                "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global instance
+reranker = CrossEncoderReranker(
+    model_name=settings.RERANK_MODEL,
+    max_cache_entries=settings.RERANK_CACHE_SIZE,
+    device=settings.EMBEDDING_DEVICE
+)
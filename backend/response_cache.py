@@ -0,0 +1,243 @@
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.config import settings
+from backend.metrics import search_cache_lookups
+
+logger = logging.getLogger(__name__)
+
+# Shared version counter of the memory backend, a little-endian uint64
+VERSION_FORMAT = struct.Struct("<Q")
+
+
+class MemoryBackend:
+    """
+    Per-process LRU of serialized responses, bounded by total bytes, with a TTL.
+    The version is a counter in a memory-mapped file shared with the other
+    workers and CLIs, so their writes invalidate this process's entries.
+    """
+    name = "memory"
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, version_path: str):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version_path = version_path
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._version_fd = None
+        self._version_map = None
+        self._version_pid = None
+        self._lock = threading.Lock()
+
+    def _version_file(self) -> mmap.mmap:
+        # Opened per process: flock() locks are shared by forks of one open file
+        if self._version_pid != os.getpid():
+            fd = os.open(self.version_path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < VERSION_FORMAT.size:
+                    os.ftruncate(fd, VERSION_FORMAT.size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._version_fd = fd
+            self._version_map = mmap.mmap(fd, VERSION_FORMAT.size)
+            self._version_pid = os.getpid()
+        return self._version_map
+
+    def get_version(self) -> int:
+        with self._lock:
+            # A read from shared memory, no system call
+            version = VERSION_FORMAT.unpack_from(self._version_file())[0]
+            if version != self._version:
+                # Entries of older versions can never be read again
+                self._clear()
+                self._version = version
+        return version
+
+    def bump_version(self):
+        with self._lock:
+            version_map = self._version_file()
+            fcntl.flock(self._version_fd, fcntl.LOCK_EX)
+            try:
+                VERSION_FORMAT.pack_into(version_map, 0, VERSION_FORMAT.unpack_from(version_map)[0] + 1)
+            finally:
+                fcntl.flock(self._version_fd, fcntl.LOCK_UN)
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class RedisBackend:
+    """
+    Cache shared by every worker (and CLI) pointed at the same Redis. The
+    version counter lives in Redis too, so a write in any process
+    invalidates every worker's entries. Memory is bounded by the TTL and
+    the server's maxmemory policy.
+    """
+    name = "redis"
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "precedent:search"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get_version(self) -> int:
+        return int(self._redis.get(f"{self.prefix}:version") or 0)
+
+    def bump_version(self):
+        self._redis.incr(f"{self.prefix}:version")
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(f"{self.prefix}:{key}")
+
+    def set(self, key: str, value: bytes):
+        self._redis.set(f"{self.prefix}:{key}", value, ex=max(1, int(self.ttl_seconds)))
+
+    def stats(self) -> dict:
+        return {"version": self.get_version()}
+
+
+class SearchResponseCache:
+    """
+    Serialized /search/ responses keyed on the normalized query and the
+    collection version. Every write to Qdrant bumps the version, so a
+    response is never served once the data behind it has changed. Backend
+    errors are logged and treated as misses, never as failed searches.
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, query, offset: int) -> Optional[str]:
+        """
+        Cache key for query at the current collection version, None when
+        caching is off or the backend is unavailable. offset replaces the
+        cursor, so both ways of asking for a page share an entry.
+        """
+        if not self.enabled:
+            return None
+        try:
+            version = self.backend.get_version()
+        except Exception as e:
+            logger.warning(f"Search cache unavailable: {e}")
+            return None
+        fields = query.model_dump(exclude={"cursor", "offset"})
+        fields["query"] = " ".join(query.query.split()).lower()
+        fields["offset"] = offset
+        digest = hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{version}:{digest}"
+
+    def get(self, key: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        (response body, next cursor) stored under key, or None.
+        """
+        if key is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {e}")
+            value = None
+        result = "hit" if value is not None else "miss"
+        search_cache_lookups.inc(result=result)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if value is None:
+            return None
+        cursor, _, body = value.partition(b"\0")
+        return body, cursor.decode() or None
+
+    def put(self, key: Optional[str], body: bytes, cursor: Optional[str]):
+        if key is None:
+            return
+        try:
+            self.backend.set(key, (cursor or "").encode() + b"\0" + body)
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+    def bump_version(self):
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_version()
+        except Exception as e:
+            logger.error(f"Could not invalidate the search cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "enabled": self.enabled,
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+        try:
+            stats.update(self.backend.stats())
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+
+def _make_backend():
+    if settings.SEARCH_CACHE_REDIS_URL:
+        return RedisBackend(settings.SEARCH_CACHE_REDIS_URL, settings.SEARCH_CACHE_TTL)
+    return MemoryBackend(settings.SEARCH_CACHE_MAX_MB * 1024 * 1024, settings.SEARCH_CACHE_TTL,
+                         settings.SEARCH_CACHE_VERSION_PATH)
+
+
+# Global instance
+search_cache = SearchResponseCache(_make_backend(), enabled=settings.SEARCH_CACHE_ENABLED)
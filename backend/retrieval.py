@@ -1,60 +1,473 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+import base64
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+from qdrant_client.http import models
 from backend.qdrant_client_wrapper import db_client
-from backend.models import SearchQuery, SearchResult, DecisionNode
+from backend.field_vectors import fuse_field_hits
+from backend.embeddings import embedder
+from backend.sparse import encode_query
+from backend.reranking import reranker, RERANK_FIELDS
+from backend.consolidation import collapse_groups
+from backend.metrics import search_stage_seconds, search_queries
+from backend.models import SearchQuery, SearchResult, DecisionNode, decision_day
 from backend.config import settings
 
-# Initialize model locally
-embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+def normalize_query(text: str) -> str:
+    # all-MiniLM-L6-v2 is uncased, so lowercasing doesn't change the vector
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class QueryVectorCache:
+    """
+    Bounded LRU of normalized query text -> embedding, with a TTL.
+    Concurrent misses for the same query share a single encode.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, text: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        key = normalize_query(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # Someone is already embedding this query, wait for their result
+                self.coalesced += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            vector = compute(key)
+            future.set_result(vector)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def get_or_compute_many(self, texts: List[str], compute_many: Callable[[List[str]], np.ndarray]) -> List[np.ndarray]:
+        """
+        Batched get_or_compute: every miss is computed in a single
+        compute_many call, duplicates within texts are computed once.
+        """
+        keys = [normalize_query(text) for text in texts]
+        found = {}
+        waiting = {}
+        owned = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found[key] = entry[0]
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                future = self._inflight.get(key)
+                if future is not None:
+                    self.coalesced += 1
+                    waiting[key] = future
+                else:
+                    future = Future()
+                    self._inflight[key] = future
+                    self.misses += 1
+                    owned[key] = future
+
+        if owned:
+            try:
+                vectors = compute_many(list(owned))
+                for (key, future), vector in zip(owned.items(), vectors):
+                    future.set_result(vector)
+                    found[key] = vector
+            except Exception as e:
+                for future in owned.values():
+                    future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        self._inflight.pop(key, None)
+
+            with self._lock:
+                expires_at = time.monotonic() + self.ttl_seconds
+                for key in owned:
+                    self._entries[key] = (found[key], expires_at)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        for key, future in waiting.items():
+            found[key] = future.result()
+        return [found[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+# Global instance
+query_cache = QueryVectorCache(
+    max_entries=settings.QUERY_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_CACHE_TTL
+)
 
 def embed_text(text: str) -> List[float]:
     """
-    Generates embedding using local SentenceTransformer model.
+    Generates embedding using the shared local SentenceTransformer model.
+    Repeated queries are served from the query cache.
     """
-    return embedding_model.encode(text).tolist()
+    return query_cache.get_or_compute(text, embedder.encode_one).tolist()
 
-def search_decisions(query: SearchQuery) -> List[SearchResult]:
+def embed_texts(texts: List[str]) -> List[List[float]]:
     """
-    Performs a semantic search on the Qdrant index.
+    Embeds several queries, encoding all cache misses in one forward pass.
     """
-    # 1. Embed the query locally
-    vector = embed_text(query.query)
-    
-    # 2. Build filters
-    filters = {}
+    return [vector.tolist() for vector in query_cache.get_or_compute_many(texts, embedder.encode)]
+
+def build_filter(query: SearchQuery) -> Optional[models.Filter]:
+    """
+    Translates the filter fields of a SearchQuery into a Qdrant filter
+    over the indexed payload fields (team, tags, source_file, decision_day).
+    """
+    must = []
+
+    teams = list(query.filter_teams or [])
     if query.filter_team:
-        filters["team"] = query.filter_team
+        teams.append(query.filter_team)
+    if teams:
+        must.append(models.FieldCondition(key="team", match=models.MatchAny(any=teams)))
 
-    # 3. Search
-    results = db_client.search(
-        vector=vector,
-        limit=query.limit,
-        filter_conditions=filters
-    )
+    if query.filter_tags_any:
+        must.append(models.FieldCondition(key="tags", match=models.MatchAny(any=query.filter_tags_any)))
+    for tag in query.filter_tags_all or []:
+        must.append(models.FieldCondition(key="tags", match=models.MatchValue(value=tag)))
+
+    if query.filter_source_file:
+        # Also matches decisions merged from several documents
+        must.append(models.Filter(should=[
+            models.FieldCondition(key="source_file", match=models.MatchValue(value=query.filter_source_file)),
+            models.FieldCondition(key="source_files", match=models.MatchValue(value=query.filter_source_file)),
+        ]))
+
+    # Dates are indexed as YYYYMMDD integers, so every date filter is a range
+    bounds = []
+    if query.filter_year is not None:
+        bounds.append((query.filter_year * 10000 + 101, query.filter_year * 10000 + 1231))
+    if query.filter_year_from is not None or query.filter_year_to is not None:
+        bounds.append((
+            query.filter_year_from * 10000 + 101 if query.filter_year_from is not None else None,
+            query.filter_year_to * 10000 + 1231 if query.filter_year_to is not None else None
+        ))
+    if query.filter_date_from or query.filter_date_to:
+        bounds.append((decision_day(query.filter_date_from), decision_day(query.filter_date_to)))
+    for gte, lte in bounds:
+        must.append(models.FieldCondition(key="decision_day", range=models.Range(gte=gte, lte=lte)))
+
+    return models.Filter(must=must) if must else None
+
+def weighted_fusion(dense_hits: list, sparse_hits: list, sparse_weight: float, limit: int) -> list:
+    """
+    Linear fusion of dense (cosine) and sparse (BM25) scores. Sparse scores
+    are unbounded, so they are scaled by the best sparse hit first.
+    The fused score is normalised back into [0, 1].
+    """
+    max_sparse = max((hit.score for hit in sparse_hits), default=0.0) or 1.0
+    scores = {}
+    hits = {}
+    for hit in dense_hits:
+        scores[hit.id] = hit.score
+        hits[hit.id] = hit
+    for hit in sparse_hits:
+        scores[hit.id] = scores.get(hit.id, 0.0) + sparse_weight * hit.score / max_sparse
+        hits.setdefault(hit.id, hit)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [hits[i].model_copy(update={"score": scores[i] / (1.0 + sparse_weight)}) for i in ranked]
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+def resolve_offset(query: SearchQuery) -> int:
+    return decode_cursor(query.cursor) if query.cursor else query.offset
+
+def next_cursor(query: SearchQuery, results: List[SearchResult]) -> Optional[str]:
+    """
+    Cursor for the following page, or None if this page wasn't full.
+    """
+    if len(results) < query.limit:
+        return None
+    return encode_cursor(resolve_offset(query) + query.limit)
+
+def format_hit(hit, query: SearchQuery, rerank_score: Optional[float] = None) -> SearchResult:
+    if query.payload_fields is not None:
+        # Partial payload, hand the selected fields back as-is
+        payload = hit.payload or {}
+        fields = {key: payload[key] for key in query.payload_fields if key in payload}
+        return SearchResult(score=hit.score, id=str(hit.id), fields=fields, rerank_score=rerank_score)
+
+    # Pydantic validation
+    node = DecisionNode(**hit.payload)
     
-    # 4. Format outputs
-    formatted_results = []
-    for hit in results:
-        # Filter out low relevance (noise)
-        if hit.score < 0.35:
-            continue
-            
-        # Pydantic validation
-        node = DecisionNode(**hit.payload)
-        
-        # Handle context (which might be a list from rationale validator)
-        raw_context = hit.payload.get("rationale", "")
-        if isinstance(raw_context, list):
-            context_str = " ".join(raw_context)
+    # Handle context (which might be a list from rationale validator)
+    raw_context = hit.payload.get("rationale", "")
+    if isinstance(raw_context, list):
+        context_str = " ".join(raw_context)
+    else:
+        context_str = str(raw_context)
+
+    return SearchResult(
+        score=hit.score,
+        decision=node,
+        context=context_str,
+        id=str(hit.id),
+        rerank_score=rerank_score
+    )
+
+def hit_to_dict(hit, query: SearchQuery, rerank_score: Optional[float] = None) -> dict:
+    """
+    Same shape as format_hit's SearchResult, built straight from the Qdrant
+    payload without validating it, for streamed responses.
+    """
+    payload = hit.payload or {}
+    result = {"score": hit.score, "decision": None, "context": "", "id": str(hit.id),
+              "fields": None, "rerank_score": rerank_score}
+    if query.payload_fields is not None:
+        result["fields"] = {key: payload[key] for key in query.payload_fields if key in payload}
+        return result
+
+    # Only the DecisionNode fields, the rest of the payload is internal
+    decision = {
+        name: payload[name] if name in payload else field.get_default(call_default_factory=True)
+        for name, field in DecisionNode.model_fields.items()
+    }
+    if isinstance(decision["rationale"], str):
+        decision["rationale"] = [decision["rationale"]]
+    result["decision"] = decision
+    result["context"] = " ".join(decision["rationale"] or [])
+    return result
+
+def _plan_search(query: SearchQuery, vector: List[float],
+                 formatter: Callable = format_hit) -> Tuple[str, list, Callable[[list], list]]:
+    """
+    Builds the Qdrant requests for one query (and the collection they go
+    to), and a function that turns their hit lists into the final results
+    (SearchResults, or whatever formatter returns). Low relevance hits are
+    dropped by Qdrant via score_threshold, so a full page is returned
+    whenever enough relevant decisions exist.
+    """
+    query_filter = build_filter(query)
+    offset = resolve_offset(query)
+    score_threshold = query.score_threshold if query.score_threshold is not None else settings.SEARCH_SCORE_THRESHOLD
+    with_payload = query.payload_fields if query.payload_fields is not None else True
+    search_params = db_client.search_params(hnsw_ef=query.hnsw_ef, exact=query.exact)
+
+    rerank = query.rerank if query.rerank is not None else settings.RERANK_ENABLED
+    if rerank:
+        # Over-fetch from the top, the page is cut after re-ordering
+        fetch_offset = 0
+        fetch_limit = max(query.rerank_candidates or settings.RERANK_CANDIDATES, offset + query.limit)
+        if query.payload_fields is not None:
+            with_payload = list(dict.fromkeys(query.payload_fields + RERANK_FIELDS))
+    elif query.group_by_decision:
+        # Over-fetch from the top, the page is cut after collapsing near-duplicates
+        fetch_offset = 0
+        fetch_limit = (offset + query.limit) * settings.HYBRID_PREFETCH_FACTOR
+    else:
+        fetch_offset, fetch_limit = offset, query.limit
+    if query.group_by_decision and isinstance(with_payload, list):
+        with_payload = list(dict.fromkeys(with_payload + ["decision_key"]))
+
+    collection = db_client.collection_name
+    if query.mode == "fields":
+        if not settings.FIELD_VECTORS_ENABLED:
+            raise ValueError("Field search is disabled, set FIELD_VECTORS_ENABLED=true")
+        weights = {field: weight for field, weight in (query.field_weights or settings.FIELD_WEIGHTS).items() if weight > 0}
+        if not weights:
+            raise ValueError("Field search needs at least one field with a positive weight")
+        # Fused client side like weighted hybrid, payloads are fetched for the fused page only
+        collection = db_client.fields_collection_name
+        limit = (fetch_offset + fetch_limit) * settings.HYBRID_PREFETCH_FACTOR
+        fields = list(weights)
+        requests = [db_client.field_request(field, vector, limit=limit, query_filter=query_filter,
+                                            search_params=search_params) for field in fields]
+
+        def collect(hit_lists):
+            fused = fuse_field_hits(dict(zip(fields, hit_lists)), weights, fetch_offset + fetch_limit, score_threshold)
+            return db_client.retrieve_scored(fused[fetch_offset:], with_payload=with_payload)
+    elif query.mode == "hybrid" and query.fusion == "weighted":
+        # Fused client side, so fetch enough candidates for every page up to this one
+        limit = (fetch_offset + fetch_limit) * settings.HYBRID_PREFETCH_FACTOR
+        requests = [db_client.dense_request(vector, limit=limit, query_filter=query_filter,
+                                            score_threshold=score_threshold, with_payload=with_payload,
+                                            search_params=search_params)]
+        if db_client.has_sparse_vectors:
+            requests.append(db_client.sparse_request(encode_query(query.query), limit=limit,
+                                                     query_filter=query_filter, with_payload=with_payload))
+
+        def collect(hit_lists):
+            dense_hits, sparse_hits = hit_lists[0], hit_lists[1] if len(hit_lists) > 1 else []
+            fused = weighted_fusion(dense_hits, sparse_hits, query.sparse_weight, fetch_offset + fetch_limit)
+            return fused[fetch_offset:]
+    else:
+        if query.mode == "hybrid":
+            request = db_client.hybrid_request(vector, encode_query(query.query), limit=fetch_limit,
+                                               query_filter=query_filter, sparse_weight=query.sparse_weight,
+                                               score_threshold=score_threshold, offset=fetch_offset,
+                                               with_payload=with_payload, search_params=search_params)
         else:
-            context_str = str(raw_context)
-
-        formatted_results.append(
-            SearchResult(
-                score=hit.score,
-                decision=node,
-                context=context_str
-            )
-        )
-        
-    return formatted_results
+            request = db_client.dense_request(vector, limit=fetch_limit, query_filter=query_filter,
+                                              score_threshold=score_threshold, offset=fetch_offset,
+                                              with_payload=with_payload, search_params=search_params)
+        requests = [request]
+
+        def collect(hit_lists):
+            return hit_lists[0]
+
+    def finish(hit_lists):
+        hits = collect(hit_lists)
+        if not rerank:
+            if query.group_by_decision:
+                hits = collapse_groups(hits)[offset:offset + query.limit]
+            return [formatter(hit, query) for hit in hits]
+        with search_stage_seconds.time("rerank", stage="rerank"):
+            ranked = reranker.rerank(query.query, hits)
+        if query.group_by_decision:
+            ranked = collapse_groups(ranked, hit_of=lambda item: item[0])
+        ranked = ranked[offset:offset + query.limit]
+        return [formatter(hit, query, rerank_score=score) for hit, score in ranked]
+
+    return collection, requests, finish
+
+def search_decisions(query: SearchQuery) -> List[SearchResult]:
+    """
+    Performs a semantic (or hybrid semantic + lexical) search on the Qdrant index.
+    """
+    return search_decisions_batch([query])[0]
+
+def search_decisions_batch(queries: List[SearchQuery]) -> List[List[SearchResult]]:
+    """
+    Runs several searches with one batched embedding pass and a single
+    Qdrant round trip per collection. Results are returned in the order of queries.
+    """
+    if not queries:
+        return []
+
+    for query in queries:
+        rerank = query.rerank if query.rerank is not None else settings.RERANK_ENABLED
+        search_queries.inc(mode=query.mode, rerank=str(rerank).lower())
+
+    # 1. Embed all queries at once (cached queries are not re-encoded)
+    with search_stage_seconds.time("embed", stage="embed"):
+        vectors = embed_texts([query.query for query in queries])
+
+    # 2. Build every query's requests into one batch per collection
+    requests = {}
+    plans = []
+    for query, vector in zip(queries, vectors):
+        collection, query_requests, finish = _plan_search(query, vector)
+        batch = requests.setdefault(collection, [])
+        plans.append((collection, len(batch), len(query_requests), finish))
+        batch.extend(query_requests)
+
+    # 3. Search
+    with search_stage_seconds.time("qdrant", stage="qdrant"):
+        hit_lists = {collection: db_client.query_batch(batch, collection_name=collection)
+                     for collection, batch in requests.items()}
+
+    # 4. Re-rank and format outputs
+    return [finish(hit_lists[collection][start:start + count]) for collection, start, count, finish in plans]
+
+def stream_search(query: SearchQuery) -> Iterator[dict]:
+    """
+    Yields the results of a search as plain dicts (see hit_to_dict), fetched
+    from Qdrant SEARCH_STREAM_PAGE_SIZE at a time so the first results can
+    be sent before the rest are retrieved. Invalid queries raise ValueError
+    here, before anything is yielded.
+    """
+    rerank = query.rerank if query.rerank is not None else settings.RERANK_ENABLED
+    search_queries.inc(mode=query.mode, rerank=str(rerank).lower())
+    start = resolve_offset(query)
+    end = start + query.limit
+    if query.limit <= 0:
+        return iter([])
+
+    with search_stage_seconds.time("embed", stage="embed"):
+        vector = embed_text(query.query)
+    # Re-ranking and grouping order all candidates at once, so they are a single page
+    page_size = query.limit if rerank or query.group_by_decision else min(settings.SEARCH_STREAM_PAGE_SIZE, query.limit)
+
+    def plan(page_start: int):
+        page = query.model_copy(update={"offset": page_start, "limit": min(page_size, end - page_start), "cursor": None})
+        return page.limit, _plan_search(page, vector, formatter=hit_to_dict)
+
+    return _stream_pages(plan, plan(start), start, end)
+
+def _stream_pages(plan: Callable, first: tuple, start: int, end: int) -> Iterator[dict]:
+    limit, (collection, requests, finish) = first
+    while True:
+        with search_stage_seconds.time("qdrant", stage="qdrant"):
+            hit_lists = db_client.query_batch(requests, collection_name=collection)
+        results = finish(hit_lists)
+        yield from results
+        start += len(results)
+        # A short page means there are no more relevant hits
+        if len(results) < limit or start >= end:
+            return
+        limit, (collection, requests, finish) = plan(start)
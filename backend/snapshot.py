@@ -0,0 +1,206 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from qdrant_client.http import models
+
+from backend.config import settings
+from backend.qdrant_client_wrapper import VECTOR_SIZE, db_client
+from backend.sparse import encode_documents, document_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of a snapshot directory changes
+SNAPSHOT_FORMAT = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.db"
+
+
+def _dense_vector(point) -> list:
+    return point.vector.get("") if isinstance(point.vector, dict) else point.vector
+
+
+def export_snapshot(directory: str, batch_size: Optional[int] = None) -> int:
+    """
+    Streams every point of the collection into directory:
+    - vectors.npy: the dense vectors as one contiguous float32 (points x 384)
+      array, written through a memory map and loadable with mmap_mode="r"
+    - payloads.db: a SQLite table of (row, id, payload JSON), row being
+      the point's row in vectors.npy
+    - manifest.json: written last, so a snapshot without it is incomplete
+    Sparse vectors are not exported, import recomputes them from the
+    payloads. Returns the number of points exported.
+    """
+    batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        raise FileExistsError(f"{directory} already holds a snapshot")
+
+    expected = db_client.client.count(collection_name=db_client.collection_name, exact=True).count
+    vectors = open_memmap(os.path.join(directory, VECTORS_FILE), mode="w+", dtype=np.float32,
+                          shape=(expected, VECTOR_SIZE))
+    payloads_path = os.path.join(directory, PAYLOADS_FILE)
+    if os.path.exists(payloads_path):
+        os.remove(payloads_path)
+    conn = sqlite3.connect(payloads_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE points (row INTEGER PRIMARY KEY, id TEXT NOT NULL, payload TEXT NOT NULL)")
+
+    start = time.perf_counter()
+    exported = 0
+    offset = None
+    try:
+        while exported < expected:
+            points, offset = db_client.client.scroll(
+                collection_name=db_client.collection_name,
+                limit=min(batch_size, expected - exported),
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                vectors[exported:exported + len(points)] = [_dense_vector(point) for point in points]
+                conn.executemany(
+                    "INSERT INTO points (row, id, payload) VALUES (?, ?, ?)",
+                    [(exported + i, json.dumps(point.id), json.dumps(point.payload)) for i, point in enumerate(points)]
+                )
+                exported += len(points)
+                if exported % (batch_size * 10) < len(points) or exported == expected:
+                    print(f"Exported {exported}/{expected} points...")
+            if offset is None:
+                break
+        if offset is not None:
+            logger.warning(f"Points added during the export were not included (snapshot has {exported})")
+        conn.commit()
+        vectors.flush()
+    finally:
+        conn.close()
+        del vectors
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": db_client.collection_name,
+        # Rows of vectors.npy past this are unused (points deleted during the export)
+        "points": exported,
+        "vector_size": VECTOR_SIZE,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "created_at": time.time(),
+        "export_seconds": round(time.perf_counter() - start, 2),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return exported
+
+
+def read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {MANIFEST_FILE} in {directory}, the snapshot is missing or incomplete")
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')}, expected {SNAPSHOT_FORMAT}")
+    if manifest["vector_size"] != VECTOR_SIZE:
+        raise ValueError(f"Snapshot vectors have {manifest['vector_size']} dimensions, the collection needs {VECTOR_SIZE}")
+    return manifest
+
+
+def import_snapshot(directory: str, batch_size: Optional[int] = None, workers: Optional[int] = None,
+                    recreate: bool = False) -> int:
+    """
+    Upserts the points of a snapshot into the collection, workers batches
+    at a time, reading vectors straight from the memory-mapped file. No
+    LLM or embedding calls are made; sparse vectors are recomputed from the
+    payloads. With recreate, the collection is dropped first. HNSW indexing
+    is paused during the upload and resumes afterwards. Returns the number
+    of points imported.
+    """
+    manifest = read_manifest(directory)
+    if manifest["embedding_model"] != settings.EMBEDDING_MODEL:
+        logger.warning(f"Snapshot was embedded with {manifest['embedding_model']}, "
+                       f"queries use {settings.EMBEDDING_MODEL}")
+    batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+    workers = workers or settings.SNAPSHOT_IMPORT_WORKERS
+    if not settings.QDRANT_URL:
+        # Embedded Qdrant is a single in-process store
+        workers = 1
+
+    if recreate:
+        for name in (db_client.collection_name, db_client.fields_collection_name):
+            if db_client.client.collection_exists(name):
+                db_client.client.delete_collection(name)
+    db_client.ensure_collection_exists()
+    with_sparse = db_client.has_sparse_vectors
+
+    total = manifest["points"]
+    vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+    payloads_path = os.path.join(directory, PAYLOADS_FILE)
+    local = threading.local()
+
+    def upload(start: int) -> int:
+        if not hasattr(local, "conn"):
+            local.conn = sqlite3.connect(f"file:{payloads_path}?mode=ro", uri=True, check_same_thread=False)
+        end = min(start + batch_size, total)
+        rows = local.conn.execute(
+            "SELECT id, payload FROM points WHERE row >= ? AND row < ? ORDER BY row", (start, end)
+        ).fetchall()
+        ids = [json.loads(point_id) for point_id, _ in rows]
+        payloads = [json.loads(payload) for _, payload in rows]
+        sparse_vectors = encode_documents([document_text(payload) for payload in payloads]) if with_sparse else None
+        db_client.upload_vectors(ids, np.ascontiguousarray(vectors[start:end]), payloads, sparse_vectors)
+        return len(ids)
+
+    indexing_threshold = db_client.client.get_collection(db_client.collection_name).config.optimizer_config.indexing_threshold
+    db_client.client.update_collection(collection_name=db_client.collection_name,
+                                       optimizer_config=models.OptimizersConfigDiff(indexing_threshold=0))
+    imported = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, count in enumerate(pool.map(upload, range(0, total, batch_size)), 1):
+                imported += count
+                if i % 10 == 0 or imported == total:
+                    print(f"Imported {imported}/{total} points...")
+    finally:
+        db_client.client.update_collection(collection_name=db_client.collection_name,
+                                           optimizer_config=models.OptimizersConfigDiff(indexing_threshold=indexing_threshold))
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the memory index to a snapshot directory, or import one.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Write every point to a snapshot directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--batch-size", type=int, default=settings.SNAPSHOT_BATCH_SIZE)
+    import_parser = sub.add_parser("import", help="Upsert the points of a snapshot directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--batch-size", type=int, default=settings.SNAPSHOT_BATCH_SIZE)
+    import_parser.add_argument("--workers", type=int, default=settings.SNAPSHOT_IMPORT_WORKERS)
+    import_parser.add_argument("--recreate", action="store_true", help="Drop the collection before importing")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    if args.command == "export":
+        count = export_snapshot(args.directory, args.batch_size)
+        print(f"Exported {count} points to {args.directory} in {time.perf_counter() - start:.1f}s")
+    elif args.command == "import":
+        count = import_snapshot(args.directory, args.batch_size, args.workers, args.recreate)
+        print(f"Imported {count} points in {time.perf_counter() - start:.1f}s")
+        if settings.FIELD_VECTORS_ENABLED:
+            print("Field vectors are not part of snapshots, run: python -m backend.maintenance build-field-index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.http import models
+
+from backend.config import settings
+
+# Name of the sparse (lexical) vector stored next to the unnamed dense vector
+SPARSE_VECTOR_NAME = "text-sparse"
+
+# Dollar amounts and numbers (keeping their digits together), or words
+# (allowing inner hyphens/underscores so codenames like "db-v2" survive)
+TOKEN_RE = re.compile(r"\$?\d[\d,.]*\d%?|\$?\d%?|[a-z][a-z0-9]*(?:[-_][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its
+not of on or our she so that the their them then there these they this to was we were
+what when which who why will with would you your did do does over than
+""".split())
+
+# BM25 parameters. IDF is applied by Qdrant (Modifier.IDF), so the
+# document side only carries the saturated term frequency.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.replace(",", "").rstrip(".")
+        if token and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _token_index(token: str) -> int:
+    # Stable across processes (unlike hash()), and fits Qdrant's uint32 indices
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _to_sparse(weights: dict) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[float(weights[i]) for i in indices])
+
+
+def encode_document(text: str) -> models.SparseVector:
+    """
+    BM25 term-frequency weights for a document.
+    """
+    counts = Counter(_token_index(t) for t in tokenize(text))
+    length = sum(counts.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / settings.SPARSE_AVG_DOC_TOKENS)
+    return _to_sparse({i: tf * (BM25_K1 + 1) / (tf + norm) for i, tf in counts.items()})
+
+
+def encode_query(text: str) -> models.SparseVector:
+    """
+    Each distinct query term counts once, Qdrant multiplies in the IDF.
+    """
+    return _to_sparse({_token_index(t): 1.0 for t in set(tokenize(text))})
+
+
+def encode_documents(texts: List[str]) -> List[models.SparseVector]:
+    return [encode_document(text) for text in texts]
+
+
+def document_text(payload: dict) -> str:
+    """
+    The lexical content of a decision payload: everything a user might
+    search for by exact name or figure, not just the embedded title/rationale.
+    """
+    parts = [payload.get("decision_title") or "", payload.get("team") or "", payload.get("outcome") or ""]
+    for key in ("rationale", "alternatives", "tags"):
+        value = payload.get(key) or []
+        parts.extend(value if isinstance(value, list) else [str(value)])
+    return "\n".join(parts)
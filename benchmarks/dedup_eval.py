@@ -0,0 +1,205 @@
+"""
+Effect of near-duplicate consolidation (DEDUP_ENABLED) on index size and
+on duplicate hits in search results.
+
+The corpus replicates synthetic variants of the mock documents (see
+benchmarks.offline): each of --distinct documents is written --copies
+times, as if several attendees had filed notes of the same meeting, with
+a different header and a few words of each paragraph reworded. Every copy
+is ingested on its own, through the fake Groq client and embedded Qdrant,
+once with consolidation off and once with it on.
+
+For each run the report gives the stored points and their dense vector
+memory, and for --queries searches the mean number of duplicate hits in
+the top --limit (hits of the same decision of the same meeting), with and
+without group_by_decision. Merges of decisions from different meetings
+are reported as false merges.
+
+    python -m benchmarks.dedup_eval
+    python -m benchmarks.dedup_eval --distinct 100 --copies 8 --merge-threshold 0.93 --json
+"""
+import argparse
+import json
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List
+
+from backend.config import settings
+from benchmarks.offline import configure, fake_decisions, load_templates, make_queries, synthesize_document, use_collection
+
+# Rewordings applied to the copies, outside each paragraph's first sentence (the decision title)
+REWORDINGS = {
+    "we": "the team",
+    "decided": "agreed",
+    "because": "since",
+    "will": "is going to",
+    "need": "have",
+    "big": "large",
+    "cost": "price",
+    "think": "believe",
+}
+
+COPY_NAME = re.compile(r"^meeting_(\d+)_copy_\d+\.txt$")
+
+
+def reword(text: str, rng: random.Random, rate: float) -> str:
+    """
+    Rewords a fraction of the REWORDINGS words in every sentence but the
+    first of each paragraph.
+    """
+    paragraphs = []
+    for paragraph in re.split(r"(\n\s*\n)", text):
+        sentences = re.split(r"(?<=[.!?])(\s+)", paragraph)
+        head, rest = sentences[0], "".join(sentences[1:])
+        rest = re.sub(r"\b(" + "|".join(REWORDINGS) + r")\b",
+                      lambda m: REWORDINGS[m.group(1)] if rng.random() < rate else m.group(1), rest)
+        paragraphs.append(head + rest)
+    return "".join(paragraphs)
+
+
+def write_replicated_corpus(directory: str, distinct: int, copies: int, rate: float, seed: int) -> List[str]:
+    templates = load_templates()
+    paths = []
+    for index in range(distinct):
+        text = synthesize_document(templates, index, seed)
+        for copy in range(copies):
+            rng = random.Random(seed * 7919 + index * 101 + copy)
+            variant = text if copy == 0 else reword(text, rng, rate)
+            path = f"{directory}/meeting_{index:05d}_copy_{copy}.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Notes filed by attendee {copy + 1}\n\n{variant}")
+            paths.append(path)
+    # Copies arrive interleaved with other meetings, not back to back
+    random.Random(seed).shuffle(paths)
+    return paths
+
+
+def meeting_of(source_file: str) -> str:
+    match = COPY_NAME.match(source_file or "")
+    return match.group(1) if match else source_file
+
+
+def duplicate_hits(results) -> int:
+    """
+    Hits beyond the first of each (meeting, decision title) in a result page.
+    """
+    from backend.ingestion import _normalize_title
+    keys = [(meeting_of(r.decision.source_file), _normalize_title(r.decision.decision_title)) for r in results]
+    return len(keys) - len(set(keys))
+
+
+def false_merges() -> int:
+    """
+    Points whose source files come from more than one meeting.
+    """
+    from backend.qdrant_client_wrapper import db_client
+    merged = 0
+    offset = None
+    while True:
+        points, offset = db_client.client.scroll(collection_name=db_client.collection_name, limit=1024,
+                                                 offset=offset, with_payload=["source_files"], with_vectors=False)
+        merged += sum(len({meeting_of(f) for f in p.payload.get("source_files") or []}) > 1 for p in points)
+        if offset is None:
+            return merged
+
+
+def run(name: str, dedup: bool, paths: List[str], queries: List[str], limit: int) -> dict:
+    from backend.ingestion import ingest_file
+    from backend.models import SearchQuery
+    from backend.qdrant_client_wrapper import VECTOR_SIZE, db_client
+    from backend.retrieval import search_decisions
+
+    settings.DEDUP_ENABLED = dedup
+    use_collection(f"dedup_eval_{name}")
+    timings = {}
+    start = time.perf_counter()
+    for path in paths:
+        ingest_file(path, timings)
+    elapsed = time.perf_counter() - start
+
+    points = db_client.client.count(collection_name=db_client.collection_name, exact=True).count
+    row = {
+        "points": points,
+        "dense_vector_mb": round(points * VECTOR_SIZE * 4 / (1024 * 1024), 3),
+        "ingest_seconds": round(elapsed, 2),
+        "consolidate_seconds": timings.get("consolidate", 0.0),
+        "false_merges": false_merges(),
+    }
+    for group in (False, True):
+        duplicates = [
+            duplicate_hits(search_decisions(SearchQuery(query=text, limit=limit, group_by_decision=group)))
+            for text in queries
+        ]
+        suffix = "_grouped" if group else ""
+        row[f"duplicates_per_query{suffix}"] = round(sum(duplicates) / len(duplicates), 3)
+        row[f"queries_with_duplicates{suffix}"] = round(sum(d > 0 for d in duplicates) / len(duplicates), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--distinct", type=int, default=30, help="Distinct synthetic meetings")
+    parser.add_argument("--copies", type=int, default=5, help="Documents written per meeting")
+    parser.add_argument("--reword-rate", type=float, default=0.3, help="Share of rewordable words changed in a copy")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--merge-threshold", type=float, default=settings.DEDUP_MERGE_THRESHOLD)
+    parser.add_argument("--group-threshold", type=float, default=settings.DEDUP_GROUP_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    configure(SimpleNamespace(qdrant_path=":memory:", llm_latency_ms=0.0, llm_jitter_ms=0.0, seed=args.seed))
+    settings.DEDUP_MERGE_THRESHOLD = args.merge_threshold
+    settings.DEDUP_GROUP_THRESHOLD = args.group_threshold
+    from backend.models import DecisionNode
+
+    templates = load_templates()
+    decisions = [
+        DecisionNode(**item, source_file=f"meeting_{index:05d}_copy_0.txt")
+        for index in range(args.distinct)
+        for item in fake_decisions(synthesize_document(templates, index, args.seed), random.Random(index))
+    ]
+    queries = make_queries(decisions, args.queries, args.seed)
+
+    corpus_dir = tempfile.mkdtemp(prefix="precedent_dedup_")
+    try:
+        paths = write_replicated_corpus(corpus_dir, args.distinct, args.copies, args.reword_rate, args.seed)
+        results = {}
+        for name, dedup in (("baseline", False), ("dedup", True)):
+            if not args.json:
+                print(f"Ingesting {len(paths)} documents ({name})...", file=sys.stderr)
+            results[name] = run(name, dedup, paths, queries, args.limit)
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    baseline, dedup = results["baseline"], results["dedup"]
+    summary = {
+        "point_reduction": round(1 - dedup["points"] / max(baseline["points"], 1), 4),
+        "duplicate_reduction": round(1 - dedup["duplicates_per_query"] / baseline["duplicates_per_query"], 4)
+        if baseline["duplicates_per_query"] else None,
+    }
+    if args.json:
+        print(json.dumps({"documents": len(paths), "queries": len(queries), "limit": args.limit,
+                          "merge_threshold": args.merge_threshold, "group_threshold": args.group_threshold,
+                          "results": results, "summary": summary}, indent=2))
+        return
+
+    print(f"{len(paths)} documents ({args.distinct} meetings x {args.copies} copies), {len(queries)} queries, "
+          f"merge >= {args.merge_threshold}, group >= {args.group_threshold}")
+    columns = ["points", "dense_vector_mb", "ingest_seconds", "false_merges",
+               "duplicates_per_query", "duplicates_per_query_grouped", "queries_with_duplicates_grouped"]
+    print(f"{'run':<10}" + "".join(f"{c:>{len(c) + 2}}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<10}" + "".join(f"{row[c]:>{len(c) + 2}}" for c in columns))
+    print(f"Points: -{summary['point_reduction']:.1%}, duplicate hits in top {args.limit}: "
+          + (f"-{summary['duplicate_reduction']:.1%}" if summary["duplicate_reduction"] is not None else "none in baseline"))
+
+
+if __name__ == "__main__":
+    main()
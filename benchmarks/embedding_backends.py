@@ -0,0 +1,138 @@
+"""
+Parity and speed of the embedding backends (PyTorch vs ONNX Runtime,
+optionally int8-quantized) on CPU.
+
+The first backend is the reference. For every other backend the report
+gives the cosine similarity of its vectors to the reference ones, the
+overlap of their top-k search results, single-query encode latency and
+batch throughput. Texts are synthetic decisions (see benchmarks.offline),
+so no collection is needed. Exits with status 1 if a backend's minimum
+cosine falls below --min-cosine.
+
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --backends torch onnx onnx:onnx/model_qint8_avx512_vnni.onnx --threads 4
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from backend.config import settings
+from backend.embeddings import EmbeddingProvider
+from backend.ingestion import build_vector_text
+from benchmarks.offline import base_decisions, make_queries, percentiles
+
+
+def parse_backend(spec: str) -> tuple:
+    # "onnx:onnx/model_qint8_avx512_vnni.onnx" -> ("onnx", "onnx/model_qint8_avx512_vnni.onnx")
+    backend, _, onnx_file = spec.partition(":")
+    return backend, onnx_file or None
+
+
+def measure(provider: EmbeddingProvider, texts: list, queries: list, batch_size: int) -> dict:
+    start = time.perf_counter()
+    provider.warm()
+    load_seconds = time.perf_counter() - start
+
+    # One query at a time, as /search/ encodes them
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(provider.encode_one(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    text_vectors = provider.encode(texts, batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "query_latency": percentiles(latencies),
+        "texts_per_second": round(len(texts) / elapsed, 1),
+        "query_vectors": np.stack(query_vectors),
+        "text_vectors": text_vectors,
+    }
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def parity(reference: dict, candidate: dict, k: int) -> dict:
+    """
+    Cosine of each vector to its reference, and the overlap of the top-k
+    texts each query retrieves with either backend.
+    """
+    ref_texts, cand_texts = normalize(reference["text_vectors"]), normalize(candidate["text_vectors"])
+    ref_queries, cand_queries = normalize(reference["query_vectors"]), normalize(candidate["query_vectors"])
+    cosines = np.concatenate([(ref_texts * cand_texts).sum(axis=1), (ref_queries * cand_queries).sum(axis=1)])
+
+    ref_top = np.argsort(-(ref_queries @ ref_texts.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_queries @ cand_texts.T), axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+    return {
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+        f"top{k}_overlap": round(float(np.mean(overlap)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"],
+                        help="backend or backend:onnx_file, the first is the reference")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=500, help="Decision texts embedded in batches")
+    parser.add_argument("--queries", type=int, default=200, help="Queries embedded one at a time")
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_THREADS,
+                        help="Intra-op threads per backend (0 = library default)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    decisions = base_decisions(args.texts, args.seed)
+    texts = [build_vector_text(decision) for decision in decisions]
+    queries = make_queries(decisions, args.queries, args.seed)
+
+    results = {}
+    reference = None
+    for spec in args.backends:
+        backend, onnx_file = parse_backend(spec)
+        provider = EmbeddingProvider(args.model, device="cpu", num_threads=args.threads,
+                                     backend=backend, onnx_file=onnx_file)
+        if not args.json:
+            print(f"Measuring {provider.describe()}...")
+        measured = measure(provider, texts, queries, args.batch_size)
+        row = {key: value for key, value in measured.items() if not key.endswith("_vectors")}
+        if reference is None:
+            reference = measured
+        else:
+            row.update(parity(reference, measured, args.k))
+            row["query_speedup"] = round(reference["query_latency"]["p50_ms"] / max(measured["query_latency"]["p50_ms"], 1e-9), 2)
+            row["throughput_speedup"] = round(measured["texts_per_second"] / reference["texts_per_second"], 2)
+        results[spec] = row
+
+    failed = [spec for spec, row in results.items() if row.get("cosine_min", 1.0) < args.min_cosine]
+    if args.json:
+        print(json.dumps({"model": args.model, "threads": args.threads, "texts": len(texts),
+                          "queries": len(queries), "results": results}, indent=2))
+    else:
+        print(f"{len(texts)} texts, {len(queries)} queries, model {args.model}, threads {args.threads or 'default'}")
+        columns = ["p50_ms", "p95_ms", "texts_per_second", "query_speedup", "cosine_mean", "cosine_min", f"top{args.k}_overlap"]
+        print(f"{'backend':<48}" + "".join(f"{c:>18}" for c in columns))
+        for spec, row in results.items():
+            values = {**row["query_latency"], **row}
+            print(f"{spec:<48}" + "".join(f"{values.get(c, '-'):>18}" for c in columns))
+        for spec in failed:
+            print(f"{spec}: minimum cosine {results[spec]['cosine_min']} is below {args.min_cosine}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Offline recall comparison of dense-only vs hybrid (dense + sparse) search.
+
+Builds "identifier" queries from the rarest tokens of each indexed decision
+(vendor names, dollar figures, codenames) and checks whether that decision
+comes back in the top k. Run against an already populated collection:
+
+    python -m benchmarks.hybrid_recall --sample 200
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+from backend.models import SearchQuery
+from backend.qdrant_client_wrapper import db_client
+from backend.retrieval import search_decisions
+from backend.sparse import tokenize, document_text
+
+# No similarity cutoff in any mode, so recall@k only measures the ranking
+# and not SEARCH_SCORE_THRESHOLD dropping dense hits
+RECALL_PARAMS = {"score_threshold": 0.0}
+
+MODES = {
+    "dense": {"mode": "dense"},
+    "hybrid-rrf": {"mode": "hybrid", "fusion": "rrf"},
+    "hybrid-weighted": {"mode": "hybrid", "fusion": "weighted"},
+}
+
+
+def load_sample(sample: int) -> list:
+    points, _ = db_client.client.scroll(
+        collection_name=db_client.collection_name,
+        limit=sample,
+        with_payload=True,
+        with_vectors=False
+    )
+    return points
+
+
+def build_queries(points: list, terms_per_query: int) -> list:
+    """
+    One query per decision made of its rarest tokens across the sample.
+    """
+    doc_tokens = [set(tokenize(document_text(p.payload))) for p in points]
+    df = Counter(token for tokens in doc_tokens for token in tokens)
+    queries = []
+    for point, tokens in zip(points, doc_tokens):
+        rare = sorted((t for t in tokens if len(t) > 2), key=lambda t: (df[t], t))[:terms_per_query]
+        if rare:
+            target = (point.payload["decision_title"], point.payload["source_file"])
+            queries.append((" ".join(rare), target))
+    return queries
+
+
+def evaluate(queries: list, params: dict, k_values: list) -> dict:
+    max_k = max(k_values)
+    hits = {k: 0 for k in k_values}
+    latencies = []
+    for text, target in queries:
+        start = time.perf_counter()
+        results = search_decisions(SearchQuery(query=text, limit=max_k, **RECALL_PARAMS, **params))
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = [(r.decision.decision_title, r.decision.source_file) for r in results]
+        rank = found.index(target) if target in found else None
+        for k in k_values:
+            if rank is not None and rank < k:
+                hits[k] += 1
+    latencies.sort()
+    return {
+        **{f"recall@{k}": round(hits[k] / len(queries), 4) for k in k_values},
+        "latency_ms_mean": round(statistics.mean(latencies), 2),
+        "latency_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=200, help="Number of decisions to build queries from")
+    parser.add_argument("--terms", type=int, default=3, help="Rare tokens per query")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    points = load_sample(args.sample)
+    queries = build_queries(points, args.terms)
+    if not queries:
+        print("Collection is empty, ingest some documents first.")
+        return
+
+    # Warm the query embedding cache so every mode is timed on retrieval alone
+    for text, _ in queries:
+        search_decisions(SearchQuery(query=text, limit=1))
+
+    report = {name: evaluate(queries, params, args.k) for name, params in MODES.items()}
+    dense_latency = report["dense"]["latency_ms_mean"]
+    for name in report:
+        report[name]["latency_vs_dense"] = round(report[name]["latency_ms_mean"] / dense_latency, 2)
+
+    if args.json:
+        print(json.dumps({"queries": len(queries), "results": report}, indent=2))
+        return
+
+    print(f"{len(queries)} identifier queries")
+    columns = list(report["dense"])
+    print(f"{'mode':<18}" + "".join(f"{c:>18}" for c in columns))
+    for name, row in report.items():
+        print(f"{name:<18}" + "".join(f"{row[c]:>18}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
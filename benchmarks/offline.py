@@ -0,0 +1,418 @@
+"""
+Offline performance benchmark: ingestion throughput, search QPS and
+latency percentiles, and memory use, with no network access.
+
+Groq is replaced by FakeGroqClient, a deterministic local stand-in with
+configurable latency, and Qdrant runs embedded (in memory by default).
+Documents are synthesized from data/mock_data. The embedding model is the
+real one, so it has to be in the local model cache.
+
+Search is measured at each --scales collection size. To reach 1M decisions
+without embedding 1M texts, the collection is filled with jittered copies
+of a few thousand embedded synthetic decisions.
+
+    python -m benchmarks.offline
+    python -m benchmarks.offline --scales 1000 100000 1000000 --output bench.json
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+from backend.chunking import estimate_tokens
+from backend.config import settings
+
+MOCK_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mock_data")
+
+TEAMS = ["Engineering", "Platform", "Data", "Finance", "Security", "People Ops", "Product", "Infrastructure"]
+# Swapped into the templates so synthetic documents differ in their names and figures
+VENDORS = ["AWS", "Azure", "GCP", "PostgreSQL", "MongoDB", "Redis", "Kafka", "Snowflake",
+           "Datadog", "Okta", "Terraform", "Kubernetes", "Cloudflare", "Stripe", "Zendesk"]
+CODENAMES = ["Phoenix", "Atlas", "Orion", "Hermes", "Nova", "Titan", "Vega", "Aurora", "Zephyr", "Nimbus"]
+
+
+class FakeGroqClient:
+    """
+    Stands in for groq.Groq. chat.completions.create sleeps for a seeded,
+    jittered latency and returns decisions derived from the prompt's input
+    text, so the same chunk always yields the same decisions.
+    """
+
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 100.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages: list, model: str = None, temperature: float = None, **kwargs):
+        prompt = messages[-1]["content"]
+        text = _prompt_input(prompt)
+        rng = random.Random(int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) ^ self.seed)
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+        content = json.dumps(fake_decisions(text, rng))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(content))
+        )
+
+
+def _prompt_input(prompt: str) -> str:
+    match = re.search(r"Input Text:\s*(.*?)\s*Return a JSON list", prompt, re.S)
+    return match.group(1) if match else prompt
+
+
+def fake_decisions(text: str, rng: random.Random, max_decisions: int = 3) -> List[dict]:
+    """
+    Turns the longest paragraphs of text into decision records shaped
+    like the real extraction output.
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if len(p.split()) >= 25]
+    paragraphs = sorted(paragraphs, key=len, reverse=True)[:max_decisions]
+    date = re.search(r"\b(20\d\d-\d\d-\d\d)\b", text)
+    year = re.search(r"\b(20\d\d)\b", text)
+    decisions = []
+    for paragraph in paragraphs:
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", paragraph) if s.strip()]
+        words = re.findall(r"[A-Za-z][A-Za-z0-9$]+", paragraph)
+        decisions.append({
+            "decision_title": " ".join(sentences[0].split()[:12]),
+            "decision_date": date.group(1) if date else (year.group(1) if year else "2024"),
+            "team": rng.choice(TEAMS),
+            "rationale": sentences[:4],
+            "alternatives": sentences[4:6],
+            "outcome": sentences[-1],
+            "tags": sorted({w.lower() for w in sorted(words, key=len, reverse=True)[:3]}),
+        })
+    return decisions
+
+
+def load_templates() -> List[str]:
+    templates = []
+    for path in sorted(glob.glob(os.path.join(MOCK_DATA_DIR, "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            templates.append(f.read())
+    if not templates:
+        raise SystemExit(f"No templates found in {MOCK_DATA_DIR}")
+    return templates
+
+
+def synthesize_document(templates: List[str], index: int, seed: int) -> str:
+    """
+    A variant of one mock document with its years, figures and vendor /
+    project names swapped, deterministic in (index, seed).
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    text = templates[index % len(templates)]
+    vendors = dict(zip(VENDORS, rng.sample(VENDORS, len(VENDORS))))
+    text = re.sub(r"\b(" + "|".join(map(re.escape, VENDORS)) + r")\b", lambda m: vendors[m.group(1)], text)
+    text = re.sub(r"\b20(1\d|2\d)\b", lambda m: str(rng.randint(2015, 2025)), text)
+    text = re.sub(r"\$(\d[\d,]*)", lambda m: f"${rng.randint(1, 900) * 1000:,}", text)
+    codename = f"{rng.choice(CODENAMES)}-{index}"
+    return f"PROJECT {codename}\n\n{text}\n\nAll actions are tracked under project {codename}.\n"
+
+
+def write_corpus(directory: str, count: int, seed: int) -> List[str]:
+    templates = load_templates()
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"synthetic_{index:06d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthesize_document(templates, index, seed))
+        paths.append(path)
+    return paths
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size, falling back to the peak where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(latencies_ms: List[float]) -> dict:
+    if len(latencies_ms) < 2:
+        value = round(latencies_ms[0], 2) if latencies_ms else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "mean_ms": value}
+    cuts = statistics.quantiles(latencies_ms, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "mean_ms": round(statistics.mean(latencies_ms), 2),
+    }
+
+
+def use_collection(name: str):
+    """
+    Points the shared Qdrant handler at a fresh, empty collection.
+    """
+    from backend.qdrant_client_wrapper import db_client
+    if db_client.client.collection_exists(name):
+        db_client.client.delete_collection(name)
+    db_client.collection_name = name
+    db_client.ensure_collection_exists()
+
+
+def bench_ingestion(docs: int, seed: int, workers: int, llm_concurrency: int, batch_size: int) -> dict:
+    from backend import ingestion
+    from backend.bulk_ingest import ingest_paths
+
+    use_collection("bench_ingest")
+    corpus_dir = tempfile.mkdtemp(prefix="precedent_corpus_")
+    try:
+        paths = write_corpus(corpus_dir, docs, seed)
+        calls_before = ingestion.groq_client.calls
+        rss_before = rss_mb()
+        summary = ingest_paths(paths, checkpoint_path=None, workers=workers,
+                               llm_concurrency=llm_concurrency, batch_size=batch_size)
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    elapsed = summary["elapsed_seconds"] or 1e-9
+    return {
+        "documents": docs,
+        "ingested": summary["ingested"],
+        "failed": summary["failed"],
+        "decisions": summary["decisions"],
+        "llm_calls": ingestion.groq_client.calls - calls_before,
+        "elapsed_seconds": summary["elapsed_seconds"],
+        "docs_per_second": summary["docs_per_second"],
+        "decisions_per_second": round(summary["decisions"] / elapsed, 2),
+        "stage_seconds": summary["stage_seconds"],
+        "rss_mb_before": rss_before,
+        "rss_mb_after": rss_mb(),
+    }
+
+
+def base_decisions(count: int, seed: int) -> list:
+    """
+    Synthetic decisions (no LLM latency) to seed the search collections.
+    """
+    from backend.models import DecisionNode
+
+    templates = load_templates()
+    decisions = []
+    index = 0
+    while len(decisions) < count:
+        text = synthesize_document(templates, index, seed)
+        for item in fake_decisions(text, random.Random(index), max_decisions=5):
+            decisions.append(DecisionNode(**item, source_file=f"synthetic_{index:06d}.txt"))
+        index += 1
+    return decisions[:count]
+
+
+def fill_collection(size: int, decisions: list, base_vectors: np.ndarray, seed: int,
+                    noise: float, batch_size: int) -> float:
+    """
+    Uploads size points cycling over the base decisions, each vector
+    jittered and re-normalized so no two points are identical.
+    Returns the upload time in seconds.
+    """
+    from backend.ingestion import build_payload
+    from backend.qdrant_client_wrapper import db_client
+    from backend.sparse import encode_documents, document_text
+
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    for offset in range(0, size, batch_size):
+        indices = np.arange(offset, min(offset + batch_size, size))
+        base = indices % len(decisions)
+        vectors = base_vectors[base] + noise * rng.standard_normal((len(indices), base_vectors.shape[1]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        payloads = []
+        for i, b in zip(indices, base):
+            payload = build_payload(decisions[b], content_hash=None)
+            payload["decision_title"] = f"{payload['decision_title']} #{i}"
+            payloads.append(payload)
+        sparse_vectors = encode_documents([document_text(p) for p in payloads])
+        db_client.upload_vectors([int(i) for i in indices], vectors, payloads, sparse_vectors)
+    return time.perf_counter() - start
+
+
+def make_queries(decisions: list, count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    prefixes = ["why did we choose", "decision on", "what was decided about", "reasons for", ""]
+    queries = []
+    for i in range(count):
+        words = decisions[rng.randrange(len(decisions))].decision_title.split()
+        keep = words[:max(3, len(words) - rng.randint(0, 4))]
+        queries.append(f"{rng.choice(prefixes)} {' '.join(keep)} ({i})".strip())
+    return queries
+
+
+def run_search_load(queries: List[str], params: dict, concurrency: int) -> dict:
+    """
+    Sends every query once through search_decisions from concurrency
+    threads and reports throughput and latency percentiles.
+    """
+    from backend.models import SearchQuery
+    from backend.retrieval import search_decisions
+
+    def one(text):
+        start = time.perf_counter()
+        search_decisions(SearchQuery(query=text, **params))
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, queries))
+    elapsed = time.perf_counter() - start
+    return {"queries": len(queries), "qps": round(len(queries) / elapsed, 2), **percentiles(latencies)}
+
+
+def bench_search(size: int, decisions: list, base_vectors: np.ndarray, args) -> dict:
+    from backend.retrieval import query_cache
+
+    use_collection(f"bench_search_{size}")
+    rss_before = rss_mb()
+    upload_seconds = fill_collection(size, decisions, base_vectors, args.seed, args.noise, args.upload_batch)
+    report = {
+        "decisions": size,
+        "upload_seconds": round(upload_seconds, 2),
+        "upload_points_per_second": round(size / upload_seconds, 2) if upload_seconds else 0.0,
+        "rss_mb_collection": round(rss_mb() - rss_before, 1),
+        "modes": {},
+    }
+
+    queries = make_queries(decisions, args.queries, args.seed + size)
+    for mode in args.modes:
+        params = {"limit": args.limit, "score_threshold": 0.0}
+        params.update({"hybrid": {"mode": "hybrid"}, "rerank": {"rerank": True}}.get(mode, {"mode": "dense"}))
+        report["modes"][mode] = {}
+        for concurrency in args.concurrency:
+            # Cold: every query pays for its embedding. Warm: embeddings cached
+            query_cache.clear()
+            cold = run_search_load(queries, params, concurrency)
+            warm = run_search_load(queries, params, concurrency)
+            report["modes"][mode][f"concurrency_{concurrency}"] = {"cold": cold, "warm": warm}
+
+    from backend.qdrant_client_wrapper import db_client
+    db_client.client.delete_collection(db_client.collection_name)
+    return report
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(MOCK_DATA_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure(args):
+    """
+    Points the backend at embedded Qdrant, the fake Groq client and an
+    in-memory document catalog. Must run before the Qdrant handler,
+    catalog and ingestion modules are imported.
+    """
+    settings.QDRANT_URL = None
+    settings.QDRANT_PATH = args.qdrant_path
+    settings.GROQ_API_KEY = settings.GROQ_API_KEY or "offline-benchmark"
+    # Keep the synthetic documents out of the real document catalog
+    settings.CATALOG_PATH = ":memory:"
+
+    from backend import ingestion
+    from backend.extraction_cache import extraction_cache
+    ingestion.groq_client = FakeGroqClient(args.llm_latency_ms, args.llm_jitter_ms, args.seed)
+    # Every chunk should go through the (fake) LLM
+    extraction_cache.enabled = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="Synthetic documents to ingest (0 skips ingestion)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000], help="Collection sizes for the search benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per search run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Concurrent search clients")
+    parser.add_argument("--modes", nargs="+", default=["dense", "hybrid"], choices=["dense", "hybrid", "rerank"])
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--base-decisions", type=int, default=2000,
+                        help="Distinct embedded decisions the search collections are built from")
+    parser.add_argument("--noise", type=float, default=0.05, help="Jitter added to copied vectors")
+    parser.add_argument("--upload-batch", type=int, default=4096)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--workers", type=int, default=settings.BULK_WORKERS)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.BULK_LLM_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_BATCH_SIZE)
+    parser.add_argument("--qdrant-path", default=":memory:", help="Embedded Qdrant path, in memory by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    configure(args)
+    from backend.embeddings import embedder
+    from backend.ingestion import build_vector_text
+
+    report = {
+        "benchmark": "offline",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "rss_mb_start": rss_mb(),
+    }
+
+    embedder.warm()
+    report["rss_mb_model_loaded"] = rss_mb()
+
+    if args.docs:
+        print(f"Ingesting {args.docs} synthetic documents...", file=sys.stderr)
+        report["ingestion"] = bench_ingestion(args.docs, args.seed, args.workers, args.llm_concurrency, args.batch_size)
+
+    decisions = base_decisions(min(args.base_decisions, max(args.scales)), args.seed)
+    base_vectors = embedder.encode([build_vector_text(d) for d in decisions])
+    report["search"] = {}
+    for size in args.scales:
+        print(f"Search benchmark at {size} decisions...", file=sys.stderr)
+        report["search"][str(size)] = bench_search(size, decisions, base_vectors, args)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
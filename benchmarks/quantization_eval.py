@@ -0,0 +1,152 @@
+"""
+Memory, latency and recall@k of the quantized / HNSW search configuration
+against the unquantized baseline.
+
+Queries are the titles of sampled decisions. Ground truth is an exhaustive
+float32 search, so recall measures what the HNSW index and quantization
+lose. Run against a populated collection on a Qdrant server (embedded mode
+always searches exhaustively and ignores these settings):
+
+    python -m benchmarks.quantization_eval --sample 500 --ef 64 128 256
+"""
+import argparse
+import json
+import statistics
+import time
+
+from qdrant_client.http import models
+
+from backend.config import settings
+from backend.embeddings import embedder
+from backend.qdrant_client_wrapper import db_client
+
+BYTES_PER_MB = 1024 * 1024
+
+
+def estimate_memory_mb(info) -> dict:
+    """
+    Rough RAM estimate for the dense vectors of a collection: float32
+    originals (unless on disk), quantized copies and the HNSW graph links.
+    """
+    params = info.config.params
+    vectors = params.vectors
+    count = info.points_count or 0
+    dim = vectors.size
+    m = info.config.hnsw_config.m
+
+    original = count * dim * 4
+    quantization = info.config.quantization_config
+    quantized = 0
+    if isinstance(quantization, models.ScalarQuantization):
+        quantized = count * dim
+    elif isinstance(quantization, models.BinaryQuantization):
+        quantized = count * dim / 8
+    # Level 0 has up to 2 * m links of 4 bytes per point
+    graph = count * m * 2 * 4
+
+    ram = graph + quantized + (0 if vectors.on_disk else original)
+    return {
+        "points": count,
+        "quantization": type(quantization).__name__ if quantization else "none",
+        "vectors_on_disk": bool(vectors.on_disk),
+        "payload_on_disk": bool(params.on_disk_payload),
+        "float32_vectors_mb": round(original / BYTES_PER_MB, 1),
+        "quantized_vectors_mb": round(quantized / BYTES_PER_MB, 1),
+        "hnsw_graph_mb": round(graph / BYTES_PER_MB, 1),
+        "estimated_ram_mb": round(ram / BYTES_PER_MB, 1),
+        "unquantized_in_ram_mb": round((original + graph) / BYTES_PER_MB, 1),
+    }
+
+
+def load_queries(sample: int) -> list:
+    points, _ = db_client.client.scroll(
+        collection_name=db_client.collection_name,
+        limit=sample,
+        with_payload=["decision_title"],
+        with_vectors=False
+    )
+    titles = [p.payload["decision_title"] for p in points if p.payload.get("decision_title")]
+    return [vector.tolist() for vector in embedder.encode(titles)]
+
+
+def run_queries(vectors: list, k: int, params: models.SearchParams) -> tuple:
+    results = []
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        hits = db_client.client.query_points(
+            collection_name=db_client.collection_name,
+            query=vector,
+            limit=k,
+            search_params=params,
+            with_payload=False
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit.id for hit in hits])
+    return results, latencies
+
+
+def evaluate(vectors: list, truth: list, k_values: list, params: models.SearchParams) -> dict:
+    results, latencies = run_queries(vectors, max(k_values), params)
+    report = {}
+    for k in k_values:
+        overlap = [len(set(found[:k]) & set(expected[:k])) / k for found, expected in zip(results, truth) if expected]
+        report[f"recall@{k}"] = round(statistics.mean(overlap), 4) if overlap else 0.0
+    latencies.sort()
+    report["latency_ms_mean"] = round(statistics.mean(latencies), 2)
+    report["latency_ms_p95"] = round(latencies[int(0.95 * (len(latencies) - 1))], 2)
+    return report
+
+
+def configurations(ef_values: list) -> dict:
+    configs = {"float32 hnsw": lambda ef: models.SearchParams(
+        hnsw_ef=ef, quantization=models.QuantizationSearchParams(ignore=True))}
+    configs["quantized"] = lambda ef: models.SearchParams(hnsw_ef=ef, quantization=models.QuantizationSearchParams(
+        rescore=True, oversampling=settings.SEARCH_QUANTIZATION_OVERSAMPLING))
+    configs["quantized no-rescore"] = lambda ef: models.SearchParams(
+        hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=False))
+    return {
+        f"{name} ef={ef or 'default'}": make(ef)
+        for ef in ef_values for name, make in configs.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=500, help="Number of decision titles to query with")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--ef", type=int, nargs="+", default=[0], help="hnsw_ef values to try (0 = server default)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    info = db_client.client.get_collection(db_client.collection_name)
+    memory = estimate_memory_mb(info)
+    vectors = load_queries(args.sample)
+    if not vectors:
+        print("Collection is empty, ingest some documents first.")
+        return
+
+    # Exhaustive float32 search is the ground truth
+    exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+    truth, _ = run_queries(vectors, max(args.k), exact)
+    report = {"exact float32": evaluate(vectors, truth, args.k, exact)}
+    for name, params in configurations([ef or None for ef in args.ef]).items():
+        report[name] = evaluate(vectors, truth, args.k, params)
+
+    if args.json:
+        print(json.dumps({"queries": len(vectors), "memory": memory, "results": report}, indent=2))
+        return
+
+    if not settings.QDRANT_URL:
+        print("Warning: embedded Qdrant ignores HNSW and quantization, run against a server for real numbers")
+    print(f"{len(vectors)} queries, {memory['points']} points")
+    for key, value in memory.items():
+        print(f"  {key}: {value}")
+    columns = list(report["exact float32"])
+    print(f"{'configuration':<32}" + "".join(f"{c:>16}" for c in columns))
+    for name, row in report.items():
+        print(f"{name:<32}" + "".join(f"{row[c]:>16}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
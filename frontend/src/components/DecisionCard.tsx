@@ -12,6 +12,7 @@ interface DecisionProps {
         alternatives: string[];
         outcome?: string;
         source_file: string;
+        source_pages?: number[];
     };
     context: string;
 }
@@ -70,6 +71,11 @@ const DecisionCard: React.FC<DecisionProps> = ({ score, decision }) => {
                     >
                         {decision.source_file}
                     </a>
+                    {decision.source_pages && decision.source_pages.length > 0 && (
+                        <span style={{ marginLeft: '4px' }}>
+                            (p. {decision.source_pages.join(', ')})
+                        </span>
+                    )}
                 </div>
             </div>
         </div>
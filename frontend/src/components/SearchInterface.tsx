@@ -14,6 +14,7 @@ interface SearchResult {
         alternatives: string[];
         outcome?: string;
         source_file: string;
+        source_pages?: number[];
     };
     context: string;
 }
@@ -32,11 +32,22 @@ const UploadZone: React.FC = () => {
         formData.append('file', file);
 
         try {
-            await axios.post(`${constant_api_base}/ingest/`, formData, {
+            const response = await axios.post(`${constant_api_base}/ingest/`, formData, {
                 headers: {
                     'Content-Type': 'multipart/form-data',
                 },
             });
+
+            // Ingestion runs in the background, poll the job until it finishes
+            let job = response.data;
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const jobResponse = await axios.get(`${constant_api_base}/ingest/${job.job_id}`);
+                job = jobResponse.data;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error);
+            }
             setUploadStatus('success');
             setRefreshTrigger(prev => prev + 1);
         } catch (error) {
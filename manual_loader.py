@@ -1,8 +1,7 @@
-import sys
 import os
-import shutil
-from backend.ingestion import ingest_file
-from backend.qdrant_client_wrapper import db_client
+from backend.bulk_ingest import ingest_paths, print_summary
+from backend.models import SearchQuery
+from backend.retrieval import search_decisions
 
 # List of files to ingest
 FILES = [
@@ -14,32 +13,27 @@ FILES = [
 def main():
     print("Starting Manual Data Injection...")
     
-    # Ensure DB is ready
-    db_client.ensure_collection_exists()
-    
-    # 1. Ingest
+    # 1. Ingest (use `python -m backend.bulk_ingest <dir>` for whole directories)
+    paths = []
     for file_path in FILES:
         abs_path = os.path.abspath(file_path)
         if not os.path.exists(abs_path):
             print(f"File not found: {abs_path}")
             continue
-            
-        print(f"Ingesting {file_path}...")
-        try:
-            ingest_file(abs_path)
-        except Exception as e:
-            print(f"Failed to ingest {file_path}: {e}")
+        paths.append(abs_path)
+
+    print_summary(ingest_paths(paths))
 
     # 2. Verify Content (Peeking into Qdrant)
     print("\nVerifying Data Quality (Checking for Verbosity)...")
     try:
-        results = db_client.search("AWS")
+        results = search_decisions(SearchQuery(query="AWS"))
         if not results:
             print("No results found for 'AWS'")
         else:
             top_result = results[0]
-            rationale = top_result.payload.get('rationale', [])
-            print(f"\nResult Found: {top_result.payload.get('decision_title')}")
+            rationale = top_result.decision.rationale
+            print(f"\nResult Found: {top_result.decision.decision_title}")
             print("\nRationale Sample (Check Length):")
             for point in rationale:
                 word_count = len(point.split())
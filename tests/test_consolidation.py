@@ -0,0 +1,72 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from backend.config import settings
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_URL", None)
+    monkeypatch.setattr(settings, "QDRANT_PATH", ":memory:")
+    monkeypatch.setattr(settings, "FIELD_VECTORS_ENABLED", True)
+    from backend.qdrant_client_wrapper import db_client
+    db_client.close()
+    db_client.connect()
+    db_client.ensure_collection_exists()
+    yield db_client
+    db_client.close()
+
+
+def test_consolidation_with_empty_fields_collection(db):
+    """
+    Decisions without field vectors (e.g. after a snapshot import) are
+    merged without touching the fields collection.
+    """
+    rng = np.random.default_rng(0)
+    vector = rng.normal(size=384).astype(np.float32)
+    vectors = np.stack([vector, vector + 0.001, rng.normal(size=384).astype(np.float32)])
+    ids = [str(uuid.uuid4()) for _ in vectors]
+    payloads = [
+        {"decision_title": "Move to AWS", "source_file": "a.txt", "team": "Engineering"},
+        {"decision_title": "Move to AWS", "source_file": "b.txt", "team": "Engineering"},
+        {"decision_title": "Hire a designer", "source_file": "b.txt", "team": "Product"},
+    ]
+    db.upload_vectors(ids, vectors, payloads)
+    assert db.client.count(collection_name=db.fields_collection_name).count == 0
+
+    from backend.consolidation import consolidate_collection
+    merged, _ = consolidate_collection()
+
+    assert merged == 1
+    points, _ = db.client.scroll(collection_name=db.collection_name, with_payload=True)
+    assert len(points) == 2
+    merged_point = next(p for p in points if p.payload["decision_title"] == "Move to AWS")
+    assert sorted(merged_point.payload["source_files"]) == ["a.txt", "b.txt"]
+    assert db.client.count(collection_name=db.fields_collection_name).count == 0
+
+
+def test_batch_merges_only_across_documents(db):
+    """
+    Near-duplicates within one document stay separate decisions, a
+    near-duplicate from another document is merged into the first.
+    """
+    rng = np.random.default_rng(1)
+    vector = rng.normal(size=384).astype(np.float32)
+    vectors = np.stack([vector, vector + 0.001, vector + 0.002])
+    ids = [str(uuid.uuid4()) for _ in vectors]
+    payloads = [
+        {"source_file": name, "source_files": [name], "source_versions": [f"{name}:h"], "tags": [],
+         "decision_key": decision_id}
+        for name, decision_id in zip(["a.txt", "a.txt", "b.txt"], ids)
+    ]
+
+    from backend.consolidation import consolidate_batch
+    keep, final_ids, updates = consolidate_batch(ids, vectors, payloads)
+
+    assert keep == [0, 1]
+    assert final_ids[:2] == ids[:2]
+    assert final_ids[2] in ids[:2]
+    assert "b.txt" in payloads[ids.index(final_ids[2])]["source_files"]
+    assert updates == {}
@@ -22,8 +22,14 @@ def check_api():
     try:
         files = {'file': ('test_doc.txt', 'Decision: Use Groq. Rationale: It is fast and free.', 'text/plain')}
         r = requests.post(f"{base_url}/ingest/", files=files)
-        if r.status_code == 200:
-            print(">> Ingest Endpoint: OK")
+        if r.status_code == 202:
+            job = r.json()
+            print(f">> Ingest Endpoint: OK. Job {job['job_id']} queued.")
+            # Wait for the background job to finish
+            while job["status"] in ("queued", "running"):
+                time.sleep(1)
+                job = requests.get(f"{base_url}/ingest/{job['job_id']}").json()
+            print(f">> Ingest Job: {job['status']} ({job['decision_count']} decisions, timings: {job['stage_timings']})")
         else:
             print(f">> Ingest Endpoint FAILED: {r.status_code} - {r.text}")
     except Exception as e: